@@ -9,6 +9,7 @@ BOTTOMMARGIN = 5
 TRAIL_LENGTH = 40
 PLAYER_SPEED = 0.08
 QIX_SPEED = 1 / 30
+QIX_COUNT = 1
 key_map = {
     pygame.K_RIGHT: "right",
     pygame.K_LEFT: "left",
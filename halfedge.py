@@ -0,0 +1,348 @@
+"""A half-edge (doubly connected edge list) graph of horizontal and vertical paths.
+
+Every line segment is cut where other segments end on it or cross it, so edges only
+meet at vertices. Each edge is stored as two half-edges running in opposite
+directions. `HalfEdge.next` is the outgoing half-edge that turns right as far as
+possible at the end of a half-edge (on the screen, y points down); following `next`
+walks once around a face, clockwise for the bounded faces and counter-clockwise
+around the outside.
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+
+from linestore import LineStore
+from piecetable import point_key
+from sweepline import intersections
+
+# Directions of the outgoing half-edges of a vertex, clockwise on the screen
+_DIRECTIONS = ((1, 0), (0, 1), (-1, 0), (0, -1))
+
+
+def _sign(value):
+    return (value > 0) - (value < 0)
+
+
+def _direction(start, end):
+    return _sign(end[0] - start[0]), _sign(end[1] - start[1])
+
+
+class Vertex:
+    """A point where edges meet; `edges` maps directions to outgoing half-edges"""
+
+    __slots__ = ("point", "edges")
+
+    def __init__(self, point):
+        self.point = point
+        self.edges = {}
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.point!r})"
+
+
+class HalfEdge:
+    __slots__ = ("origin", "twin", "next", "prev")
+
+    def __init__(self, origin):
+        self.origin = origin
+        self.twin = None
+        self.next = None
+        self.prev = None
+
+    @property
+    def destination(self):
+        return self.twin.origin
+
+    @property
+    def line(self):
+        return self.origin.point, self.twin.origin.point
+
+    @property
+    def direction(self):
+        return _direction(self.origin.point, self.twin.origin.point)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}{self.line!r}"
+
+
+class PlanarGraph:
+    """The planar graph of a set of horizontal and vertical line segments.
+
+    Vertices can be looked up by their coordinates, and the next half-edge around a
+    face is found in constant time. The vertices are also indexed by row and by
+    column, so `add_line` and `remove_line` can update the graph in place: they
+    only touch the vertices on the line and the edges it crosses.
+    """
+
+    def __init__(self, lines=()):
+        self._vertices = {}
+        # (rows, columns): y -> sorted x of the vertices on that row, and vice versa
+        self._index = ({}, {})
+        self._keys = ([], [])  # the sorted keys of the rows and columns
+        self._touched = set()  # points of vertices whose edges have changed
+
+        horizontals, verticals = LineStore("horizontal"), LineStore("vertical")
+        for p0, p1 in lines:
+            p0, p1 = point_key(p0), point_key(p1)
+            if p0 != p1:
+                (horizontals if _axis(p0, p1) == 0 else verticals).add((p0, p1))
+
+        # Cut every segment where a perpendicular segment touches or crosses it
+        cuts_on_row, cuts_on_column = defaultdict(set), defaultdict(set)
+        for y, x0, x1 in horizontals.segments():
+            cuts_on_row[y].update((x0, x1))
+        for x, y0, y1 in verticals.segments():
+            cuts_on_column[x].update((y0, y1))
+        for (x, y), _, _ in intersections((horizontals, verticals)):
+            cuts_on_row[y].add(x)
+            cuts_on_column[x].add(y)
+
+        for y, x0, x1 in horizontals.segments():
+            cuts = sorted(cuts_on_row[y])
+            xs = cuts[bisect_left(cuts, x0) : bisect_right(cuts, x1)]
+            for a, b in zip(xs, xs[1:]):
+                self._add_edge((a, y), (b, y))
+        for x, y0, y1 in verticals.segments():
+            cuts = sorted(cuts_on_column[x])
+            ys = cuts[bisect_left(cuts, y0) : bisect_right(cuts, y1)]
+            for a, b in zip(ys, ys[1:]):
+                self._add_edge((x, a), (x, b))
+        self._link()
+
+    def add_line(self, start, end):
+        """Add a horizontal or vertical line segment to the graph.
+
+        :return: the pieces (start, end) of the line that were not in the graph before
+        """
+        added = []
+        vertices = self._cut(start, end)
+        if vertices:
+            direction = _direction(vertices[0].point, vertices[-1].point)
+            for a, b in zip(vertices, vertices[1:]):
+                if direction not in a.edges:
+                    self._add_edge(a.point, b.point)
+                    if added and added[-1][1] == a.point:
+                        added[-1] = (added[-1][0], b.point)
+                    else:
+                        added.append((a.point, b.point))
+            self._tidy(vertices)
+        return added
+
+    def remove_line(self, start, end):
+        """Remove a horizontal or vertical line segment from the graph.
+
+        Only the edges along the line go; the vertices at its ends stay, unless no
+        edges are left there.
+        """
+        vertices = self._cut(start, end)
+        if vertices:
+            direction = _direction(vertices[0].point, vertices[-1].point)
+            for vertex in vertices[:-1]:
+                if direction in vertex.edges:
+                    self._remove_edge(vertex.edges[direction])
+            self._tidy(vertices)
+
+    def _cut(self, start, end):
+        """Make sure that the vertices on the line include its ends and the points
+        where it crosses an edge; return all vertices on the line in order"""
+        start, end = point_key(start), point_key(end)
+        if start == end:
+            return []
+        axis = _axis(start, end)
+        key, low, high = (
+            start[1 - axis],
+            min(start[axis], end[axis]),
+            max(start[axis], end[axis]),
+        )
+        self._split_at(start)
+        self._split_at(end)
+        # Perpendicular edges cross the line where their column (or row) has a
+        # vertex before the line with an edge across it
+        across = _DIRECTIONS[1 - axis]
+        keys = self._keys[1 - axis]
+        for other in keys[bisect_left(keys, low) : bisect_right(keys, high)]:
+            coords = self._index[1 - axis][other]
+            i = bisect_left(coords, key)
+            if i > 0 and (i == len(coords) or coords[i] != key):
+                before = _point(axis, other, coords[i - 1])
+                edge = self._vertices[before].edges.get(across)
+                if edge is not None:
+                    self._split(edge, _point(axis, other, key))
+        coords = self._index[axis][key]
+        points = [
+            _point(axis, coord, key)
+            for coord in coords[bisect_left(coords, low) : bisect_right(coords, high)]
+        ]
+        if start[axis] > end[axis]:
+            points.reverse()
+        return [self._vertices[point] for point in points]
+
+    def _split_at(self, point):
+        """Add a vertex at `point`, splitting the edge it lies on, if any"""
+        if point in self._vertices:
+            return
+        for axis in (0, 1):
+            coords = self._index[axis].get(point[1 - axis], ())
+            i = bisect_left(coords, point[axis])
+            if i > 0:
+                before = _point(axis, coords[i - 1], point[1 - axis])
+                edge = self._vertices[before].edges.get(_DIRECTIONS[axis])
+                if edge is not None:
+                    self._split(edge, point)
+                    return
+        self._vertex(point)
+
+    def _split(self, edge, point):
+        start, end = edge.line
+        self._remove_edge(edge)
+        self._add_edge(start, point)
+        self._add_edge(point, end)
+
+    def _tidy(self, vertices):
+        """Drop the vertices that have lost all their edges, join the edges of the
+        vertices where the only two edges run straight on, and link the changed
+        vertices again"""
+        for vertex in vertices:
+            if self._vertices.get(vertex.point) is not vertex:
+                continue
+            if not vertex.edges:
+                self._remove_vertex(vertex)
+            elif len(vertex.edges) == 2:
+                first, second = vertex.edges.values()
+                if first.direction == _opposite(second.direction):
+                    start, end = second.destination.point, first.destination.point
+                    self._remove_edge(first)
+                    self._remove_edge(second)
+                    self._remove_vertex(vertex)
+                    self._add_edge(start, end)
+        self._link()
+
+    def _link(self):
+        """Set `next` and `prev` of the half-edges ending at the touched vertices"""
+        for point in self._touched:
+            vertex = self._vertices.get(point)
+            if vertex is None:
+                continue
+            for edge in vertex.edges.values():
+                edge.twin.next = _right_turn(edge.twin)
+                edge.twin.next.prev = edge.twin
+        self._touched.clear()
+
+    def _add_edge(self, start, end):
+        edge = HalfEdge(self._vertex(start))
+        edge.twin = HalfEdge(self._vertex(end))
+        edge.twin.twin = edge
+        edge.origin.edges[_direction(start, end)] = edge
+        edge.twin.origin.edges[_direction(end, start)] = edge.twin
+        self._touched.update((start, end))
+
+    def _remove_edge(self, edge):
+        del edge.origin.edges[edge.direction]
+        del edge.destination.edges[edge.twin.direction]
+        self._touched.update(edge.line)
+
+    def _vertex(self, point):
+        if point not in self._vertices:
+            self._vertices[point] = Vertex(point)
+            for axis in (0, 1):
+                index, keys = self._index[axis], self._keys[axis]
+                if point[1 - axis] not in index:
+                    index[point[1 - axis]] = []
+                    insort(keys, point[1 - axis])
+                insort(index[point[1 - axis]], point[axis])
+        return self._vertices[point]
+
+    def _remove_vertex(self, vertex):
+        point = vertex.point
+        del self._vertices[point]
+        for axis in (0, 1):
+            index, keys = self._index[axis], self._keys[axis]
+            coords = index[point[1 - axis]]
+            del coords[bisect_left(coords, point[axis])]
+            if not coords:
+                del index[point[1 - axis]]
+                del keys[bisect_left(keys, point[1 - axis])]
+
+    def __len__(self):
+        """The number of vertices"""
+        return len(self._vertices)
+
+    def vertex(self, point):
+        """The Vertex at `point`, or None"""
+        return self._vertices.get(point_key(point))
+
+    def vertices(self):
+        return self._vertices.values()
+
+    def half_edges(self):
+        for vertex in self._vertices.values():
+            yield from vertex.edges.values()
+
+    def edge(self, start, end):
+        """The half-edge leaving `start` towards `end`, or None.
+
+        `end` need not be a vertex; the first half-edge of the path is returned.
+        """
+        vertex = self.vertex(start)
+        if vertex is None:
+            return None
+        return vertex.edges.get(_direction(point_key(start), point_key(end)))
+
+    @staticmethod
+    def face(edge):
+        """Walk around the face to the right of `edge`, yielding its half-edges"""
+        current = edge
+        while True:
+            yield current
+            current = current.next
+            if current is edge:
+                return
+
+    def faces(self):
+        """One list of half-edges per face, the outer faces included"""
+        seen = set()
+        for edge in self.half_edges():
+            if id(edge) not in seen:
+                face = list(self.face(edge))
+                seen.update(id(e) for e in face)
+                yield face
+
+
+def face_lines(edges):
+    """Turn half-edges into lines, joining consecutive edges that run straight on"""
+    lines = []
+    for edge in edges:
+        start, end = edge.line
+        if lines and _direction(*lines[-1]) == edge.direction:
+            start = lines.pop()[0]
+        lines.append((start, end))
+    return lines
+
+
+def _axis(start, end):
+    """0 for a horizontal line, 1 for a vertical line"""
+    if start[1] == end[1]:
+        return 0
+    if start[0] == end[0]:
+        return 1
+    raise ValueError("PlanarGraph only takes horizontal and vertical lines")
+
+
+def _point(axis, coord, key):
+    """The point at `coord` along a line of the given axis at `key`"""
+    return (coord, key) if axis == 0 else (key, coord)
+
+
+def _opposite(direction):
+    return -direction[0], -direction[1]
+
+
+def _right_turn(edge):
+    """The outgoing half-edge at the end of `edge` that turns right the most;
+    going back along the twin only at a dead end"""
+    back = _DIRECTIONS.index(edge.twin.direction)
+    edges = edge.twin.origin.edges
+    for i in (back - 1, back - 2, back - 3, back):
+        direction = _DIRECTIONS[i % 4]
+        if direction in edges:
+            return edges[direction]
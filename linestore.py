@@ -1,38 +1,177 @@
+from array import array
+from bisect import bisect_left, bisect_right, insort
 from collections import defaultdict
+from collections.abc import Sequence
 from typing import Tuple, Union, Optional
 
 import pygame
 
 
+class LineRow:
+    """The segments (start, end) on one key of a LineStore.
+
+    The coordinates are packed into two integer arrays `starts` and `ends` instead
+    of a list of tuples. Indexing a LineRow still gives (start, end) pairs.
+    """
+
+    __slots__ = ("starts", "ends")
+
+    def __init__(self, segments=()):
+        self.starts = array("i")
+        self.ends = array("i")
+        for start, end in segments:
+            self.append((start, end))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return list(zip(self.starts[item], self.ends[item]))
+        return self.starts[item], self.ends[item]
+
+    def __setitem__(self, item, segments):
+        if not isinstance(item, slice):
+            item, segments = slice(item, item + 1 or None), [segments]
+        self.starts[item] = array("i", [start for start, _ in segments])
+        self.ends[item] = array("i", [end for _, end in segments])
+
+    def __iter__(self):
+        return zip(self.starts, self.ends)
+
+    def __contains__(self, segment):
+        return any(segment == other for other in self)
+
+    def __eq__(self, other):
+        if isinstance(other, LineRow):
+            return self.starts == other.starts and self.ends == other.ends
+        if isinstance(other, (list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({list(self)!r})"
+
+    def append(self, segment):
+        self.starts.append(segment[0])
+        self.ends.append(segment[1])
+
+    def insert(self, index, segment):
+        self.starts.insert(index, segment[0])
+        self.ends.insert(index, segment[1])
+
+
+class LineView(Sequence):
+    """Read-only view of the segments on one key of a LineStore as lines ((x0, y0), (x1, y1)).
+
+    The lines are built when they are first accessed and cached by the LineStore
+    until the key changes.
+    """
+
+    __slots__ = ("store", "key")
+
+    def __init__(self, store: "LineStore", key):
+        self.store = store
+        self.key = key
+
+    def __len__(self):
+        return len(self.store.lines.get(self.key, ()))
+
+    def __getitem__(self, item):
+        lines = self.store._materialize(self.key)
+        if isinstance(item, slice):
+            return list(lines[item])
+        return lines[item]
+
+    def __iter__(self):
+        return iter(self.store._materialize(self.key))
+
+    def __eq__(self, other):
+        if isinstance(other, Sequence):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({list(self)!r})"
+
+
 class LineStore:
-    def __init__(self, dim: str):
+    """Store horizontal or vertical line segments indexed by their common coordinate.
+
+    For each key (the y coordinate of horizontals, the x coordinate of verticals),
+    `lines[key]` is a LineRow that holds the segments on that line as pairs (start, end)
+    of integers in the other coordinate. The pairs are kept sorted, with start <= end.
+    This allows lookups by bisection. The keys that hold segments are kept in a sorted
+    list as well, for range queries across keys.
+
+    With `auto_simplify` (the default), `add` merges a new segment with the segments
+    it overlaps or touches, so no two segments of a key ever overlap. Otherwise,
+    `add` only inserts the segment and marks its key as dirty; `simplify` then merges
+    the dirty keys and leaves all others alone. `remove`, `subtract`, `overlapping`,
+    `find` and `segments` merge a dirty key before they use it, but `get_lines`
+    and `get_near` return its segments as they are stored until `simplify` is called.
+
+    The lines returned by `get_lines` and `get_near` are cached per key and only
+    rebuilt after `add`, `subtract` or `simplify` have changed the keys involved.
+    Changes made directly through `lines` are not noticed.
+    """
+
+    def __init__(self, dim: str, auto_simplify: bool = True):
         if dim not in ["horizontal", "vertical"]:
             raise ValueError("Dimension dim must be either 'horizontal' or 'vertical'")
         self.dim = dim
-        self.lines = defaultdict(list)
+        self.auto_simplify = auto_simplify
+        self.lines = defaultdict(LineRow)
+        self._keys = []  # sorted keys with at least one segment
+        self._dirty = set()  # keys whose segments may overlap
+        self._lines_cache = {}  # key -> tuple of lines on that key
+        self._near_cache = {}  # key -> tuple of lines returned by get_near
 
-    def _make_lines(self, other_coord, line_endpoints):
+    def _materialize(self, key):
         """Turn the internal representation by only one coordinate of the endpoints
         and an index for the other dimension into the standard representation of
         a tuple of startpoint and endpoint: ((x0,y0), (x1,y1))"""
-        if self.dim == "horizontal":
-            return [((x0, other_coord), (x1, other_coord)) for x0, x1 in line_endpoints]
-        else:
-            return [((other_coord, y0), (other_coord, y1)) for y0, y1 in line_endpoints]
+        lines = self._lines_cache.get(key)
+        if lines is None:
+            row = self.lines.get(key)
+            if not row:
+                return ()
+            if self.dim == "horizontal":
+                lines = tuple(((x0, key), (x1, key)) for x0, x1 in row)
+            else:
+                lines = tuple(((key, y0), (key, y1)) for y0, y1 in row)
+            self._lines_cache[key] = lines
+        return lines
+
+    def _changed(self, key):
+        """Drop the cached lines that include `key`"""
+        self._lines_cache.pop(key, None)
+        for k in range(key - 2, key + 3):
+            self._near_cache.pop(k, None)
 
     def get_lines(self, key):
-        return self._make_lines(key, self.lines[key])
+        """Return a view of the lines on `key` in the standard representation of
+        a tuple of startpoint and endpoint: ((x0,y0), (x1,y1))
+
+        Looking up a key without lines does not add it to the LineStore.
+        """
+        return LineView(self, key)
 
     def get_near(self, key):
         """Proximity search: Find lines that depart at a position +/-2 pixels around `key`.
 
-        Closer matches are returned first in the list.
+        Closer matches are returned first in the (read-only) sequence.
         """
-        return [
-            line
-            for k in [key, key - 1, key + 1, key - 2, key + 2]
-            for line in self.get_lines(k)
-        ]
+        near = self._near_cache.get(key)
+        if near is None:
+            near = tuple(
+                line
+                for k in [key, key - 1, key + 1, key - 2, key + 2]
+                for line in self._materialize(k)
+            )
+            if near:
+                self._near_cache[key] = near
+        return near
 
     def add(
         self,
@@ -43,34 +182,306 @@ class LineStore:
     ):
         """Add a line segment to this LineStore.
 
+        With `auto_simplify`, the new segment is merged with all segments on the same key
+        that it overlaps or touches, so the segments of each key stay sorted and disjoint.
+
+        The coordinates must be integers, or floats with integral values (as in a
+        pygame.Vector2); anything else raises a ValueError.
+
         The line segment is not checked whether its direction (horizontal or vertical)
         matches the type of the LineStore. Expect weird results when you place a horizontal
         line in a 'vertical' LineStore or vice versa.
         """
         if self.dim == "horizontal":
-            key = line[0][1]  # index by y coordinate
-            value = (line[0][0], line[1][0])  # store x_0 and x_1
+            key = _coordinate(line[0][1])  # index by y coordinate
+            # store x_0 and x_1
+            start, end = sorted((_coordinate(line[0][0]), _coordinate(line[1][0])))
+        else:
+            key = _coordinate(line[0][0])  # index by x coordinate
+            # store y_0 and y_1
+            start, end = sorted((_coordinate(line[0][1]), _coordinate(line[1][1])))
+        if not self.lines.get(key):
+            insort(self._keys, key)
+        self._changed(key)
+        if not self.auto_simplify:
+            row = self.lines[key]
+            row.insert(bisect_right(row.starts, start), (start, end))
+            self._dirty.add(key)
+            return
+        row = self._merged_row(key)
+        lo, hi = self._overlap_range(row, start, end)
+        if lo < hi:
+            start = min(start, row.starts[lo])
+            end = max(end, row.ends[hi - 1])
+        row[lo:hi] = [(start, end)]
+
+    def extend(self, lines):
+        """Add many line segments at once.
+
+        This is faster than calling `add` for each of them, because the new segments
+        are grouped by key first and each key is sorted and merged only once.
+        """
+        if self.dim == "horizontal":
+            segments = (
+                (
+                    _coordinate(line[0][1]),
+                    _coordinate(line[0][0]),
+                    _coordinate(line[1][0]),
+                )
+                for line in lines
+            )
+        else:
+            segments = (
+                (
+                    _coordinate(line[0][0]),
+                    _coordinate(line[0][1]),
+                    _coordinate(line[1][1]),
+                )
+                for line in lines
+            )
+        self.extend_segments(segments)
+
+    def extend_segments(self, segments):
+        """Add many segments given as triples (key, start, end) of integers at once.
+
+        See `extend`.
+        """
+        by_key = defaultdict(list)
+        for key, start, end in segments:
+            if start > end:
+                start, end = end, start
+            by_key[key].append((start, end))
+        new_keys = [key for key in by_key if not self.lines.get(key)]
+        if new_keys:
+            self._keys = sorted(self._keys + new_keys)
+        for key, coords in by_key.items():
+            row = self.lines[key]
+            coords.extend(row)
+            coords.sort()
+            if self.auto_simplify:
+                row[:] = simplify_one_coord(coords, presorted=True)
+                self._dirty.discard(key)
+            else:
+                row[:] = coords
+                self._dirty.add(key)
+            self._changed(key)
+
+    def remove(
+        self,
+        line: Tuple[
+            Union[Tuple[int, int], pygame.math.Vector2],
+            Union[Tuple[int, int], pygame.math.Vector2],
+        ],
+    ):
+        """Remove a line segment from this LineStore.
+
+        Stored segments that cover more than the given line are cut back to the parts
+        outside of it. See `subtract`.
+        """
+        if self.dim == "horizontal":
+            self.subtract(line[0][1], line[0][0], line[1][0])
         else:
-            key = line[0][0]  # index by x coordinate
-            value = (line[0][1], line[1][1])  # store y_0 and y_1
-        self.lines[key].append(value)
+            self.subtract(line[0][0], line[0][1], line[1][1])
+
+    def subtract(self, key, start, end):
+        """Remove the interval between `start` and `end` from the segments on `key`.
+
+        Segments are closed, so the parts that are left over keep the endpoints
+        of the removed interval: removing (3, 5) from (0, 10) leaves (0, 3) and (5, 10).
+        For the same reason, point segments such as (3, 3) or (5, 5) that lie on an
+        end of the interval are kept; only those strictly inside it are removed.
+        Removing a single point does nothing.
+        """
+        start, end = sorted((start, end))
+        if start == end or key not in self.lines:
+            return
+        row = self._merged_row(key)
+        lo, hi = self._overlap_range(row, start, end)
+        if lo == hi:
+            return
+        self._changed(key)
+        remainder = []
+        if row.starts[lo] < start or row[lo] == (start, start):
+            remainder.append((row.starts[lo], start))
+        if row.ends[hi - 1] > end or row[hi - 1] == (end, end):
+            remainder.append((end, row.ends[hi - 1]))
+        row[lo:hi] = remainder
+        if not row:
+            del self.lines[key]
+            del self._keys[bisect_left(self._keys, key)]
+
+    def _merged_row(self, key):
+        if key in self._dirty:
+            self._simplify(key)
+        return self.lines[key]
+
+    @staticmethod
+    def _overlap_range(row, start, end):
+        """Find the slice of a sorted, merged row that overlaps or touches [start, end]"""
+        lo = bisect_left(row.starts, start)
+        # The segment before the insertion point may reach into [start, end]
+        if lo > 0 and row.ends[lo - 1] >= start:
+            lo -= 1
+        hi = bisect_right(row.starts, end, lo)
+        return lo, hi
+
+    def overlapping(self, key, start, end):
+        """Return the segments (start, end) on `key` that share at least one point
+        with the interval [start, end], ordered by their start.
+        """
+        if key not in self.lines:
+            return []
+        row = self._merged_row(key)
+        lo, hi = self._overlap_range(row, start, end)
+        return row[lo:hi]
+
+    def find(self, key, coord):
+        """Return the segment (start, end) on `key` that contains `coord`, or None"""
+        if key not in self.lines:
+            return None
+        row = self._merged_row(key)
+        i = bisect_right(row.starts, coord) - 1
+        if i >= 0 and row.ends[i] >= coord:
+            return row[i]
+        return None
+
+    def keys_between(self, first, last):
+        """Return the keys from `first` to `last` (inclusive) that hold segments, in ascending order"""
+        lo = bisect_left(self._keys, first)
+        hi = bisect_right(self._keys, last, lo)
+        return self._keys[lo:hi]
+
+    def segments(self):
+        """Iterate over all segments as triples (key, start, end), ordered by key and start"""
+        for key in self._keys:
+            for start, end in self._merged_row(key):
+                yield key, start, end
+
+    def clear(self):
+        """Remove all line segments"""
+        self.lines.clear()
+        self._keys.clear()
+        self._dirty.clear()
+        self._lines_cache.clear()
+        self._near_cache.clear()
 
     def simplify(self, key: Optional[int] = None) -> None:
         """Merge overlapping line segments
 
-        :param key: (optional) simplify for this index. If not given, simplify for all keys
+        Without a key, only the keys that were changed by `add` since they were last
+        merged are simplified. A key that has been modified directly through `lines`
+        must be simplified explicitly.
+
+        :param key: (optional) simplify for this index. If not given, simplify all dirty keys
         """
         if key is not None:
             self._simplify(key)
         else:
-            for key in self.lines.keys():
+            for key in list(self._dirty):
                 self._simplify(key)
 
     def _simplify(self, key: int):
-        self.lines[key] = simplify_one_coord(self.lines[key])
+        row = self.lines.get(key)
+        if row is not None:
+            row[:] = simplify_one_coord(row)
+            self._changed(key)
+        self._dirty.discard(key)
+
+
+class StixStore:
+    """The points of a growing polyline, e.g. the stix, together with its line segments
+    in a horizontal and a vertical LineStore.
 
+    Only the end of the polyline changes while the player moves: `extend_last`
+    moves the last point, `append` starts a new line segment. The last line segment
+    is therefore kept out of the LineStores until the next point is appended,
+    so neither operation has to touch the rest of the polyline. Instead, it has a
+    pair of LineStores of its own, which hold nothing but the last line segment.
+    """
+
+    def __init__(self, *points):
+        self.points = []
+        self.horizontals = LineStore(dim="horizontal")
+        self.verticals = LineStore(dim="vertical")
+        self._last_horizontal = LineStore(dim="horizontal")
+        self._last_vertical = LineStore(dim="vertical")
+        for point in points:
+            self.append(point)
+
+    def __len__(self):
+        return len(self.points)
+
+    def __getitem__(self, item):
+        return self.points[item]
+
+    def __iter__(self):
+        return iter(self.points)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.points!r})"
+
+    def append(self, point):
+        """Add a new point and with it a new last line segment"""
+        if len(self.points) > 1:
+            self._add_segment(self.points[-2], self.points[-1])
+        self.points.append(point)
+        self._update_last()
+
+    def extend_last(self, point):
+        """Move the end point of the last line segment"""
+        self.points[-1] = point
+        self._update_last()
+
+    def clear(self):
+        self.points.clear()
+        for store in self._stores():
+            store.clear()
+
+    def _stores(self):
+        return (
+            self.verticals,
+            self.horizontals,
+            self._last_vertical,
+            self._last_horizontal,
+        )
+
+    def _add_segment(self, p0, p1):
+        if p0[0] == p1[0]:  # same x coordinate: vertical line
+            self.verticals.add((p0, p1))
+        elif p0[1] == p1[1]:  # same y coordinate: horizontal line
+            self.horizontals.add((p0, p1))
+        else:
+            raise ValueError("Stix contains a diagonal line")
+
+    def _update_last(self):
+        self._last_horizontal.clear()
+        self._last_vertical.clear()
+        if len(self.points) > 1:
+            p0, p1 = self.points[-2], self.points[-1]
+            last = self._last_vertical if p0[0] == p1[0] else self._last_horizontal
+            last.add((p0, p1))
+
+    def line_intersect(self, line, ignore=None):
+        """Check if the given line intersects any line segment of the polyline.
+
+        See `line_intersect` for the possible return values.
+        """
+        for store in self._stores():
+            intersection = line_intersect(line, store, ignore=ignore)
+            if intersection:
+                return intersection
+        return ()
 
-def simplify_one_coord(coords):
+
+def _coordinate(value):
+    """Convert a coordinate to int, refusing to cut off a fractional part"""
+    integer = int(value)
+    if integer != value:
+        raise ValueError(f"LineStore coordinates must be integers, not {value}")
+    return integer
+
+
+def simplify_one_coord(coords, presorted=False):
     """
     Merge all overlapping line segments in a list of line segments on the same horizontal or vertical line.
 
@@ -79,10 +490,13 @@ def simplify_one_coord(coords):
     considering horizontal and vertical lines.)
 
     :param coords: list of pairs (start, end) in one coordinate direction
+    :param presorted: (optional) the pairs are already sorted, each with start <= end
     :return: list of (start, end) of maximal contiguous line segments
     """
     result = []
-    lines = sorted(coords)
+    if not coords:
+        return result
+    lines = coords if presorted else sorted(tuple(sorted(line)) for line in coords)
     # Lexicographic ordering implies that the lines are sorted by their starting points,
     # so at a given y coordinate, we get the line segments from left to right. (Top to bottom for verticals)
     # We merge overlapping line segments, so that we create (left to right) one maximal contiguous segment.
@@ -95,7 +509,7 @@ def simplify_one_coord(coords):
             result.append(line_old)
             line_old = line
         else:  # overlapping ==> join lines and continue with merged line segment
-            line_old = (line_old[0], line[1])
+            line_old = (line_old[0], max(line_old[1], line[1]))
     else:
         result.append(line_old)  # save the last segment
     return result
@@ -104,17 +518,31 @@ def simplify_one_coord(coords):
 def decompose_rects(
     *rects: pygame.Rect,
     horizontals: Optional[LineStore] = None,
-    verticals: Optional[LineStore] = None
+    verticals: Optional[LineStore] = None,
 ):
-    horizontals = horizontals or LineStore(dim="horizontal")
-    verticals = verticals or LineStore(dim="vertical")
+    """Add the sides of the given rects to LineStores (new ones, unless given).
+
+    The rects may also be given as (left, top, width, height) sequences.
+    All sides are added in one go, see `LineStore.extend`.
+    """
+    if horizontals is None:
+        horizontals = LineStore(dim="horizontal")
+    if verticals is None:
+        verticals = LineStore(dim="vertical")
+    rows = []
+    columns = []
     for r in rects:
+        if not isinstance(r, pygame.Rect):
+            r = pygame.Rect(r)
+        left, top, right, bottom = r.left, r.top, r.right, r.bottom
         # We insert each side so that it runs from left to right or top to bottom
         # (x_start <= x_end && y_start <= y_end)
-        horizontals.add((r.topleft, r.topright))
-        horizontals.add((r.bottomleft, r.bottomright))
-        verticals.add((r.topleft, r.bottomleft))
-        verticals.add((r.topright, r.bottomright))
+        rows.append((top, left, right))
+        rows.append((bottom, left, right))
+        columns.append((left, top, bottom))
+        columns.append((right, top, bottom))
+    horizontals.extend_segments(rows)
+    verticals.extend_segments(columns)
     horizontals.simplify()
     verticals.simplify()
     return horizontals, verticals
@@ -125,8 +553,10 @@ def decompose_polyline(
     horizontals: Optional[LineStore] = None,
     verticals: Optional[LineStore] = None,
 ):
-    horizontals = horizontals or LineStore(dim="horizontal")
-    verticals = verticals or LineStore(dim="vertical")
+    if horizontals is None:
+        horizontals = LineStore(dim="horizontal")
+    if verticals is None:
+        verticals = LineStore(dim="vertical")
     for p0, p1 in polyline2linesegments(polyline):
         if p0[0] == p1[0]:  # same x coordinate: vertical line
             verticals.add((p0, p1))
@@ -168,9 +598,7 @@ def line_intersect(line, linestore: LineStore, ignore=None):
         raise ValueError("line_intersect can only check horizontal and vertical lines")
 
     if mode == "horizontal" and linestore.dim == "horizontal":
-        lines = linestore.get_lines(y_start)
-        for curr_l in lines:
-            x0, x1 = sorted((curr_l[0][0], curr_l[1][0]))
+        for x0, x1 in linestore.overlapping(y_start, x_start, x_end):
             i_x0 = max(x0, x_start)
             i_x1 = min(x1, x_end)
             if i_x0 == i_x1 and (i_x0, y_start) != ignore:
@@ -179,9 +607,7 @@ def line_intersect(line, linestore: LineStore, ignore=None):
                 return (i_x0, y_start), (i_x1, y_start)
 
     if mode == "vertical" and linestore.dim == "vertical":
-        lines = linestore.get_lines(x_start)
-        for curr_l in lines:
-            y0, y1 = sorted((curr_l[0][1], curr_l[1][1]))
+        for y0, y1 in linestore.overlapping(x_start, y_start, y_end):
             i_y0 = max(y0, y_start)
             i_y1 = min(y1, y_end)
             if i_y0 == i_y1 and (x_start, i_y0) != ignore:
@@ -191,20 +617,14 @@ def line_intersect(line, linestore: LineStore, ignore=None):
 
     if mode == "horizontal" and linestore.dim == "vertical":
         y_coord = y_start
-        for x_coord in range(x_start, x_end + 1):
-            lines = linestore.get_lines(x_coord)
-            for curr_l in lines:
-                y0, y1 = sorted((curr_l[0][1], curr_l[1][1]))
-                if y0 <= y_coord <= y1 and (x_coord, y_coord) != ignore:
-                    return x_coord, y_coord
+        for x_coord in linestore.keys_between(x_start, x_end):
+            if linestore.find(x_coord, y_coord) and (x_coord, y_coord) != ignore:
+                return x_coord, y_coord
 
     if mode == "vertical" and linestore.dim == "horizontal":
         x_coord = x_start
-        for y_coord in range(y_start, y_end + 1):
-            lines = linestore.get_lines(y_coord)
-            for curr_l in lines:
-                x0, x1 = sorted((curr_l[0][0], curr_l[1][0]))
-                if x0 <= x_coord <= x1 and (x_coord, y_coord) != ignore:
-                    return x_coord, y_coord
+        for y_coord in linestore.keys_between(y_start, y_end):
+            if linestore.find(y_coord, x_coord) and (x_coord, y_coord) != ignore:
+                return x_coord, y_coord
 
     return ()
@@ -0,0 +1,246 @@
+from typing import Optional
+
+import numpy as np
+
+
+class ArrayLineStore:
+    """A LineStore that keeps its line segments in NumPy arrays.
+
+    The segments are stored in three columns `keys`, `starts` and `ends`, sorted by key
+    and start, with overlapping segments on the same key merged (like `LineStore`).
+    New segments are collected in a list and only merged into the arrays when the
+    store is read, so adding many segments in a row is cheap.
+
+    The single-line queries (`get_lines`, `overlapping`, `find`, `keys_between`) match
+    those of `LineStore`, so `linestore.line_intersect` works with both. In addition,
+    `line_intersect_many` checks a whole batch of lines at once.
+    """
+
+    def __init__(self, dim: str):
+        if dim not in ["horizontal", "vertical"]:
+            raise ValueError("Dimension dim must be either 'horizontal' or 'vertical'")
+        self.dim = dim
+        self._keys = np.empty(0, dtype=np.int64)
+        self._starts = np.empty(0, dtype=np.int64)
+        self._ends = np.empty(0, dtype=np.int64)
+        self._pending = []  # segments (key, start, end) added one by one
+        self._pending_arrays = []  # arrays of segments added by `extend`
+
+    def __len__(self):
+        """Number of (merged) line segments in the store"""
+        return len(self.keys)
+
+    @property
+    def keys(self):
+        self._consolidate()
+        return self._keys
+
+    @property
+    def starts(self):
+        self._consolidate()
+        return self._starts
+
+    @property
+    def ends(self):
+        self._consolidate()
+        return self._ends
+
+    def add(self, line):
+        """Add a line segment to this store.
+
+        As with `LineStore`, the direction of the line segment is not checked.
+        """
+        if self.dim == "horizontal":
+            self._pending.append((line[0][1], line[0][0], line[1][0]))
+        else:
+            self._pending.append((line[0][0], line[0][1], line[1][1]))
+
+    def extend(self, lines):
+        """Add many line segments at once, given as an array-like of shape (n, 2, 2)"""
+        lines = np.asarray(lines, dtype=np.int64).reshape(-1, 2, 2)
+        if self.dim == "horizontal":
+            segments = lines[:, [0, 0, 1], [1, 0, 0]]
+        else:
+            segments = lines[:, [0, 0, 1], [0, 1, 1]]
+        self.extend_segments(segments)
+
+    def extend_segments(self, segments):
+        """Add many segments at once, given as an array-like of triples (key, start, end)"""
+        self._pending_arrays.append(np.asarray(segments, dtype=np.int64).reshape(-1, 3))
+
+    def simplify(self, key: Optional[int] = None) -> None:
+        """Merge overlapping line segments.
+
+        Segments are merged whenever the store is read, so this only forces that
+        to happen now. `key` is accepted for compatibility with `LineStore`.
+        """
+        self._consolidate()
+
+    def _consolidate(self):
+        if not self._pending and not self._pending_arrays:
+            return
+        pending = np.concatenate(
+            [np.array(self._pending, dtype=np.int64).reshape(-1, 3)]
+            + self._pending_arrays
+        )
+        self._pending = []
+        self._pending_arrays = []
+        if not len(pending):
+            return
+        keys = np.concatenate((self._keys, pending[:, 0]))
+        coords = np.concatenate(
+            (
+                np.stack((self._starts, self._ends), axis=1),
+                np.sort(pending[:, 1:], axis=1),  # start <= end
+            )
+        )
+        starts, ends = coords[:, 0], coords[:, 1]
+        order = np.lexsort((starts, keys))
+        keys, starts, ends = keys[order], starts[order], ends[order]
+        # Running maximum of the ends within each key: shifting every key by more than
+        # the whole coordinate range makes the running maximum restart at each new key.
+        shift = (keys - keys[0]) * (ends.max() - starts.min() + 1)
+        reach = np.maximum.accumulate(ends + shift) - shift
+        # A segment starts a new merged segment unless it overlaps or touches
+        # the segments before it on the same key.
+        first = np.ones(len(keys), dtype=bool)
+        first[1:] = (keys[1:] != keys[:-1]) | (starts[1:] > reach[:-1])
+        group_starts = np.flatnonzero(first)
+        group_ends = np.append(group_starts[1:], len(keys)) - 1
+        self._keys = keys[group_starts]
+        self._starts = starts[group_starts]
+        self._ends = reach[group_ends]
+
+    def _row(self, key):
+        keys = self.keys
+        lo, hi = np.searchsorted(keys, [key, key + 1])
+        return lo, hi
+
+    def _make_lines(self, other_coord, line_endpoints):
+        if self.dim == "horizontal":
+            return [((x0, other_coord), (x1, other_coord)) for x0, x1 in line_endpoints]
+        else:
+            return [((other_coord, y0), (other_coord, y1)) for y0, y1 in line_endpoints]
+
+    def _endpoints(self, lo, hi):
+        return list(zip(self._starts[lo:hi].tolist(), self._ends[lo:hi].tolist()))
+
+    def get_lines(self, key):
+        lo, hi = self._row(key)
+        return self._make_lines(key, self._endpoints(lo, hi))
+
+    def get_near(self, key):
+        """Proximity search: Find lines that depart at a position +/-2 pixels around `key`.
+
+        Closer matches are returned first in the list.
+        """
+        return [
+            line
+            for k in [key, key - 1, key + 1, key - 2, key + 2]
+            for line in self.get_lines(k)
+        ]
+
+    def overlapping(self, key, start, end):
+        """Return the segments (start, end) on `key` that share at least one point
+        with the interval [start, end], ordered by their start.
+        """
+        lo, hi = self._row(key)
+        first = lo + np.searchsorted(self._ends[lo:hi], start)
+        last = lo + np.searchsorted(self._starts[lo:hi], end, side="right")
+        return self._endpoints(first, last)
+
+    def find(self, key, coord):
+        """Return the segment (start, end) on `key` that contains `coord`, or None"""
+        found = self.overlapping(key, coord, coord)
+        return found[0] if found else None
+
+    def keys_between(self, first, last):
+        """Return the keys from `first` to `last` (inclusive) that hold segments, in ascending order"""
+        keys = self.keys
+        lo = np.searchsorted(keys, first)
+        hi = np.searchsorted(keys, last, side="right")
+        return np.unique(keys[lo:hi]).tolist()
+
+    def segments(self):
+        """Iterate over all segments as triples (key, start, end), ordered by key and start"""
+        return zip(self.keys.tolist(), self._starts.tolist(), self._ends.tolist())
+
+    def line_intersect_many(self, lines, ignore=None):
+        """Check a batch of horizontal and vertical lines against the line segments in this store.
+
+        This is the vectorized version of `linestore.line_intersect`: for every line,
+        it finds the same intersection as `line_intersect` would, but it only reports
+        the first point of it (for an overlap, the end with the smaller coordinate).
+
+        Memory use is proportional to the number of lines times the number of segments.
+
+        :param lines: array-like of shape (n, 2, 2), n lines ((x0, y0), (x1, y1))
+        :param ignore: (optional) array-like of shape (2,) or (n, 2): a point per line
+            that does not count as an intersection if the line only touches a segment there
+        :return: a pair of arrays: `hit` of shape (n,), True where a line intersects a segment,
+            and `points` of shape (n, 2) holding the intersection points (zeros where there is no hit)
+        """
+        lines = np.asarray(lines, dtype=np.int64).reshape(-1, 2, 2)
+        x0, y0 = lines[:, 0, 0], lines[:, 0, 1]
+        x1, y1 = lines[:, 1, 0], lines[:, 1, 1]
+        horizontal = y0 == y1
+        vertical = (x0 == x1) & ~horizontal
+        if not np.all(horizontal | vertical):
+            raise ValueError(
+                "line_intersect_many can only check horizontal and vertical lines"
+            )
+        # Describe every line in the coordinates of the store: the key it runs along
+        # (if parallel to the segments) and the range it covers in the other direction.
+        if self.dim == "horizontal":
+            parallel = horizontal
+            line_key = np.where(parallel, y0, x0)
+            lo = np.where(parallel, np.minimum(x0, x1), np.minimum(y0, y1))
+            hi = np.where(parallel, np.maximum(x0, x1), np.maximum(y0, y1))
+        else:
+            parallel = vertical
+            line_key = np.where(parallel, x0, y0)
+            lo = np.where(parallel, np.minimum(y0, y1), np.minimum(x0, x1))
+            hi = np.where(parallel, np.maximum(y0, y1), np.maximum(x0, x1))
+
+        keys, starts, ends = self.keys, self.starts, self.ends
+        if not len(keys):
+            return np.zeros(len(lines), dtype=bool), np.zeros((len(lines), 2), np.int64)
+        col = np.s_[:, np.newaxis]
+        # parallel lines: same key and overlapping ranges
+        i_start = np.maximum(starts, lo[col])
+        i_end = np.minimum(ends, hi[col])
+        par_hit = parallel[col] & (keys == line_key[col]) & (i_start <= i_end)
+        # perpendicular lines: the segment's key lies in the line's range and
+        # the line's key lies on the segment
+        perp_hit = (
+            ~parallel[col]
+            & (lo[col] <= keys)
+            & (keys <= hi[col])
+            & (starts <= line_key[col])
+            & (line_key[col] <= ends)
+        )
+        # the point of intersection, in (key, coordinate) form
+        p_coord = np.where(parallel[col], i_start, line_key[col])
+        p_key = np.broadcast_to(keys, p_coord.shape)
+        if self.dim == "horizontal":
+            px, py = p_coord, p_key
+        else:
+            px, py = p_key, p_coord
+
+        if ignore is not None:
+            ignore = np.broadcast_to(
+                np.asarray(ignore, dtype=np.int64), (len(lines), 2)
+            )
+            ignored = (px == ignore[:, 0][col]) & (py == ignore[:, 1][col])
+            # An overlap of more than one point cannot be ignored
+            par_hit &= ~(ignored & (i_start == i_end))
+            perp_hit &= ~ignored
+
+        hits = par_hit | perp_hit
+        hit = hits.any(axis=1)
+        # Segments are sorted, so the first match is the one `line_intersect` finds
+        first = hits.argmax(axis=1)
+        rows = np.arange(len(lines))
+        points = np.stack((px[rows, first], py[rows, first]), axis=1)
+        points[~hit] = 0
+        return hit, points
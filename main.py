@@ -1,11 +1,14 @@
 from collections import deque
+from itertools import chain
 from random import randint, random
-from typing import List
+from typing import List, Optional
 
 import pygame
 from acrylic import Color
 
+from halfedge import PlanarGraph
 from polyline import ClosedPolyline, rect2poly
+from rectilinear import union_into
 from common import (
     WIDTH,
     HEIGHT,
@@ -18,13 +21,26 @@ from common import (
     key_map,
     directions,
     QIX_SPEED,
+    QIX_COUNT,
     CLOSE_AREA,
 )
-from linestore import LineStore, line_intersect, decompose_polyline
-from paths import point_is_on_line
+from linestore import LineStore, StixStore, decompose_rects, decompose_polyline
 
 clock = pygame.time.Clock()
 
+# The colours of a Qix go around the colour wheel at full saturation and value. They
+# are converted to RGB once, in steps of a tenth of a degree.
+HUE_STEPS = 3600
+HUE_COLORS = [
+    tuple(Color(hsv=[step * 360.0 / HUE_STEPS, 100.0, 100.0]).rgb)
+    for step in range(HUE_STEPS)
+]
+
+
+def hue_color(hue):
+    """The (r, g, b) colour for a hue in degrees (any real number), from `HUE_COLORS`"""
+    return HUE_COLORS[int(hue % 360.0 * HUE_STEPS / 360.0) % HUE_STEPS]
+
 
 def randvec2(max_x, max_y=None, min_x=None, min_y=None):
     if max_y is None:
@@ -41,27 +57,27 @@ def randvec2(max_x, max_y=None, min_x=None, min_y=None):
 class Qix:
     def __init__(self, screen, boundary=None):
         self.screen = screen
+        # The open area the Qix roams in
         self.boundary = boundary or rect2poly(screen.get_rect())
+        x0, y0, x1, y1 = self.boundary.bounding_box()
         self.a_s = deque(
-            [randvec2(min_x=0, max_x=WIDTH, min_y=0, max_y=HEIGHT)], maxlen=TRAIL_LENGTH
+            [randvec2(min_x=-x0, max_x=x1 - 1, min_y=-y0, max_y=y1 - 1)],
+            maxlen=TRAIL_LENGTH,
         )
         self.b_s = deque(
-            [randvec2(min_x=0, max_x=WIDTH, min_y=0, max_y=HEIGHT)], maxlen=TRAIL_LENGTH
-        )
-        self.color_s = deque(
-            [Color(hsv=[random() * 360.0, 100.0, 100.0])], maxlen=TRAIL_LENGTH
+            [randvec2(min_x=-x0, max_x=x1 - 1, min_y=-y0, max_y=y1 - 1)],
+            maxlen=TRAIL_LENGTH,
         )
+        self.hue = random() * 360.0
+        self.color_s = deque([hue_color(self.hue)], maxlen=TRAIL_LENGTH)
         self.va = randvec2(10)
         self.vb = randvec2(10)
         self.omega = randint(5, 20)  # angular velocity on the colour wheel
 
     def move(self, dt):
-        # TODO: bounce of `self.boundary` not of the screen rect
         abs_dt = dt * QIX_SPEED
-        c = self.color_s[-1].hsv
-        new_hue = (c.h + abs_dt * self.omega) % 360.0
-        new_color = Color(hsv=[new_hue, c.s, c.v])
-        self.color_s.append(new_color)
+        self.hue = (self.hue + abs_dt * self.omega) % 360.0
+        self.color_s.append(hue_color(self.hue))
 
         new_a = self.a_s[-1] + abs_dt * self.va
         if new_a.x < 0:
@@ -76,7 +92,7 @@ class Qix:
         if new_a.y > HEIGHT:
             new_a.y = 2 * HEIGHT - new_a.y
             self.va.y = -self.va.y
-        self.a_s.append(new_a)
+        self.a_s.append(self.keep_inside(self.a_s[-1], new_a, self.va))
 
         new_b = self.b_s[-1] + abs_dt * self.vb
         if new_b.x < 0:
@@ -91,18 +107,55 @@ class Qix:
         if new_b.y > HEIGHT:
             new_b.y = 2 * HEIGHT - new_b.y
             self.vb.y = -self.vb.y
-        self.b_s.append(new_b)
+        self.b_s.append(self.keep_inside(self.b_s[-1], new_b, self.vb))
+
+    def keep_inside(self, old, new, velocity):
+        """Bounce off the edge of the open area when moving from `old` to `new`.
+
+        A Qix that is outside its area (after the area was split) moves on freely
+        until it gets back in."""
+        if self.boundary.surrounds(new):
+            return new
+        hits = self.boundary.intersections((old, new))
+        if not hits:
+            return new
+        (x0, y0), (x1, y1) = hits[0][1]
+        if x0 == x1:  # vertical edge
+            new.x = 2 * x0 - new.x
+            velocity.x = -velocity.x
+        else:
+            new.y = 2 * y0 - new.y
+            velocity.y = -velocity.y
+        if self.boundary.surrounds(new):
+            return new
+        # bounced into a corner
+        return pygame.math.Vector2(old)
 
     def show(self):
         width = 3
         for v1, v2, c in reversed(list(zip(self.a_s, self.b_s, self.color_s))):
-            pygame.draw.line(self.screen, c.hex, v1, v2, width=width)
+            pygame.draw.line(self.screen, c, v1, v2, width=width)
             if width > 1:
                 width = 1
 
 
+class OpenRegion:
+    """A part of the playing field that is still open, and the Qix roaming in it"""
+
+    def __init__(self, boundary: ClosedPolyline, qixes: List[Qix]):
+        self.boundary = boundary
+        # The Qix check their position against the boundary on every frame
+        self.boundary.index_slabs()
+        self.qixes = qixes
+        for qix in qixes:
+            qix.boundary = boundary
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.boundary!r}, {len(self.qixes)} Qix)"
+
+
 class Player(pygame.sprite.Sprite):
-    def __init__(self, border, safe_paths, stix):
+    def __init__(self, border, open_regions, stix):
         super().__init__()
         self.image = pygame.surface.Surface((10, 10))
         self.rect = self.image.get_rect()
@@ -113,8 +166,7 @@ class Player(pygame.sprite.Sprite):
         self.direction = "standstill"
         self.standstill = True
         self.border = border
-        self.boundary = rect2poly(border)
-        self.paths = safe_paths
+        self.open_regions = open_regions
         self.stix = stix
         self.safe = True
 
@@ -139,15 +191,9 @@ class Player(pygame.sprite.Sprite):
         # Check if movement intersects with any other path
         # check against stix
         if len(self.stix) > 1:
-            stix_h, stix_v = decompose_polyline(self.stix)
-            intersection = line_intersect(movement, stix_v, ignore=self.rect.center)
-            if intersection:
-                print(f"Intersection (v) at {intersection}")
-                # don't move!
-                return False
-            intersection = line_intersect(movement, stix_h, ignore=self.rect.center)
+            intersection = self.stix.line_intersect(movement, ignore=self.rect.center)
             if intersection:
-                print(f"Intersection (h) at {intersection}")
+                print(f"Intersection at {intersection}")
                 # don't move!
                 return False
 
@@ -177,20 +223,23 @@ class Player(pygame.sprite.Sprite):
                 print("Move executed\n")
                 if dir_changed:
                     self.stix.append(self.rect.center)
-                    if any(
-                        point_is_on_line(self.rect.center, line_segment)
-                        for line_segment in self.boundary.line_segments()
-                    ):
+                    if self.on_boundary(self.rect.center):
                         pygame.event.post(
                             pygame.event.Event(CLOSE_AREA, {"polyline": self.stix})
                         )
                 else:
-                    self.stix[-1] = self.rect.center
+                    self.stix.extend_last(self.rect.center)
                 print(self.stix)
             else:
                 print("Move not allowed\n")
             # TODO: close box when a 'stix' meets a safe line
 
+    def on_boundary(self, point):
+        return any(
+            region.boundary.segment_at(point) is not None
+            for region in self.open_regions
+        )
+
 
 class QixGame:
     def __init__(self):
@@ -232,18 +281,36 @@ class QixGame:
         bounds = self.border.copy()
         bounds.width -= 1
         bounds.height -= 1
-        # Open area: where the Qix roams
-        self.boundary_open: ClosedPolyline = rect2poly(bounds)
-        # Closed areas: Areas the player has already surrounded
+        # Open areas, each with the Qix roaming in it. Closing an area splits one
+        # of them; a part without a Qix is closed.
+        self.open_regions: List[OpenRegion] = []
+        # The safe paths are the edges of the open area
+        decompose_rects(
+            bounds, horizontals=self.safe_horizontals, verticals=self.safe_verticals
+        )
+        # Closed areas: Areas the player has already surrounded, merged where they
+        # touch: outer boundaries (positive area) and holes (negative area)
         self.boundary_closed: List[ClosedPolyline] = []
+        # Remove redundant vertices from the boundaries after each closure
+        self.compact_boundaries = True
         # stix is a polyline (pygame.draw.lines()) where all segments are
         # either horizontal or vertical.
-        # Only one Stix polyline can exist at any one time
-        self.stix = []  # keep track of unfinished player track
-        self.qix = Qix(self.screen, self.boundary_open)
-        self.player = pygame.sprite.Group(Player(bounds, self.boundary_open, self.stix))
+        # Only one Stix polyline can exist at any one time.
+        # It is shared with the player, who extends it while moving.
+        self.stix = StixStore()  # keep track of unfinished player track
+        boundary_open = rect2poly(bounds)
+        # The same safe paths as a planar graph for walking around faces
+        # (see paths.find_path), updated together with the LineStores
+        self.safe_graph = PlanarGraph(boundary_open.line_segments())
+        self.qixes = [Qix(self.screen, boundary_open) for _ in range(QIX_COUNT)]
+        self.open_regions.append(OpenRegion(boundary_open, list(self.qixes)))
+        self.player = pygame.sprite.Group(Player(bounds, self.open_regions, self.stix))
         self.score = 0
         self.percentage = 0
+        self.total_area = boundary_open.area()
+        self.covered_area = 0
+        # The border and the closed areas, drawn again only after an area is closed
+        self.background = None
 
     def run(self):
         self.start()
@@ -258,24 +325,74 @@ class QixGame:
 
     def close_area(self, event):
         print("Closed an area", event)
-        self.boundary_open.insert(self.stix[0])
-        self.boundary_open.insert(self.stix[-1])
-        boundary1, boundary2 = self.boundary_open.split(self.stix)
-
-        # Determine which part of the split area to close
-        # Note: with only one Qix, the logic is very simple
-        if boundary1.surrounds(self.qix.a_s[0]):
-            to_close = boundary2
-            self.boundary_open = boundary1
+        stix = [tuple(point) for point in self.stix]
+        stix = [p for i, p in enumerate(stix) if i == 0 or p != stix[i - 1]]
+        region = self.region_of(stix)
+        if region is None:
+            print("The stix does not cut through an open area")
+            self.stix.clear()
+            return
+        # Work on a copy (sharing the points), so the region is left as it was
+        # if the stix does not split it after all
+        boundary = ClosedPolyline(region.boundary.points)
+        if self.compact_boundaries:
+            # The player may have moved along the boundary right after leaving it or
+            # right before reaching it again: those parts of the stix are no new edges
+            while len(stix) > 2 and boundary.segment_at(stix[1]) is not None:
+                del stix[0]
+            while len(stix) > 2 and boundary.segment_at(stix[-2]) is not None:
+                del stix[-1]
+        boundary.insert(stix[0])
+        boundary.insert(stix[-1])
+        boundary1, boundary2 = boundary.split(stix)
+        if self.compact_boundaries:
+            boundary1.compact()
+            boundary2.compact()
+        if not boundary1.area() or not boundary2.area():
+            print("The stix does not split the open area")
+            self.stix.clear()
+            return
+
+        # Each Qix stays on the side that holds most of its trail. The trails of
+        # all Qix in the region are checked in one batch.
+        trails = [list(qix.a_s) + list(qix.b_s) for qix in region.qixes]
+        inside = boundary1.surrounds_many(chain.from_iterable(trails))
+        qixes1, qixes2 = [], []
+        start = 0
+        for qix, trail in zip(region.qixes, trails):
+            inside_trail = sum(inside[start : start + len(trail)])
+            (qixes1 if 2 * inside_trail > len(trail) else qixes2).append(qix)
+            start += len(trail)
+        # A side without a Qix is closed (or the first side, if there is no Qix)
+        if qixes1 and qixes2:
+            self.open_regions.remove(region)
+            self.open_regions.append(OpenRegion(boundary1, qixes1))
+            self.open_regions.append(OpenRegion(boundary2, qixes2))
+            # Both parts stay open: the stix separates them
+            self.update_safe_paths(None, stix)
+            self.stix.clear()
+            return
+        if qixes1:
+            to_close, kept = boundary2, (boundary1, qixes1)
         else:
-            to_close = boundary1
-            self.boundary_open = boundary2
-        self.boundary_closed.append(to_close)
+            to_close, kept = boundary1, (boundary2, qixes2)
+        try:
+            self.boundary_closed = union_into(self.boundary_closed, to_close)
+        except ValueError as error:
+            # e.g. the stix left the open area and the new area overlaps a closed one
+            print(f"Cannot close the area: {error}")
+            self.stix.clear()
+            return
+        self.open_regions.remove(region)
+        self.open_regions.append(OpenRegion(*kept))
+        self.update_safe_paths(to_close, stix)
 
         # Calculate score
         area = to_close.area()
         percentage = area / (self.border.width - 1)
-        self.percentage += percentage
+        self.covered_area += area
+        self.percentage = self.covered_area / self.total_area
+        self.background = None
         # TODO: multiplier for "slow" mode
         score = int(percentage * 1000)
         print(f"Gained {area} pixels")
@@ -288,14 +405,66 @@ class QixGame:
             print(f"Level finished with {int(self.percentage * 100)}% area enclosed!")
             print("Well done!")
 
-        self.stix = []
+        self.stix.clear()
+
+    def region_of(self, stix) -> Optional[OpenRegion]:
+        """The open region the stix was drawn in: both its ends are on the region's
+        boundary, and most of its segments run through the inside.
+
+        Return None if there is no such region, e.g. if the stix is a single point
+        or lies on the boundary."""
+        middles = [
+            ((x0 + x1) / 2, (y0 + y1) / 2)
+            for (x0, y0), (x1, y1) in zip(stix, stix[1:])
+            if (x0, y0) != (x1, y1)
+        ]
+        best, best_inside = None, 0
+        for region in self.open_regions:
+            boundary = region.boundary
+            if boundary.segment_at(stix[0]) is None:
+                continue
+            if boundary.segment_at(stix[-1]) is None:
+                continue
+            inside = sum(
+                is_inside and boundary.segment_at(middle) is None
+                for middle, is_inside in zip(middles, boundary.surrounds_many(middles))
+            )
+            if inside > best_inside:
+                best, best_inside = region, inside
+        return best
+
+    def update_safe_paths(self, closed: Optional[ClosedPolyline], stix):
+        """The edges of a newly closed area are no longer safe, except for the stix,
+        which now borders the open area, and the parts that border other open areas.
+        Without a closed area, the stix is added."""
+        still_open = []
+        for p0, p1 in closed.line_segments() if closed else ():
+            self.safe_graph.remove_line(p0, p1)
+            if p0[0] == p1[0]:  # vertical
+                self.safe_verticals.remove((p0, p1))
+            else:
+                self.safe_horizontals.remove((p0, p1))
+            for region in self.open_regions:
+                for shared, _ in region.boundary.intersections((p0, p1)):
+                    if isinstance(shared[0], tuple):  # an overlap, not a point
+                        still_open.append(shared)
+        decompose_polyline(
+            stix, horizontals=self.safe_horizontals, verticals=self.safe_verticals
+        )
+        for p0, p1 in chain(zip(stix, stix[1:]), still_open):
+            self.safe_graph.add_line(p0, p1)
+        for p0, p1 in still_open:
+            (self.safe_verticals if p0[0] == p1[0] else self.safe_horizontals).add(
+                (p0, p1)
+            )
 
     def mainloop(self):
         done = False
         player_dir = "standstill"
         while not done:
             self.draw_screen()
-            self.qix.show()
+            for qix in self.qixes:
+                qix.show()
             pygame.display.flip()
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
@@ -312,20 +481,41 @@ class QixGame:
                     player_dir = key_map.get(event.key, "standstill")
             # print(player_dir)
             dt = clock.tick(20)
-            self.qix.move(dt)
+            for qix in self.qixes:
+                qix.move(dt)
             self.player.update(dt, player_dir)
 
     def draw_stix(self):
         if len(self.stix) < 2:
             return
-        pygame.draw.lines(self.screen, (250, 200, 20), False, self.stix)
+        pygame.draw.lines(self.screen, (250, 200, 20), False, self.stix.points)
+
+    def draw_background(self):
+        background = pygame.Surface(self.screen.get_size())
+        background.fill((0, 0, 0))
+        pygame.draw.rect(background, (150, 100, 10), self.border, width=1)
+        outers = [poly for poly in self.boundary_closed if poly.area() > 0]
+        holes = [poly for poly in self.boundary_closed if poly.area() < 0]
+        # The rectangles do not include the right and bottom edges of a polygon,
+        # but the closed area does
+        for poly in outers:
+            for rect in poly.rectangles():
+                background.fill(
+                    (0xC0, 0xC0, 0xC0), (rect.x, rect.y, rect.w + 1, rect.h + 1)
+                )
+        for poly in holes:
+            for rect in poly.rectangles():
+                background.fill((0, 0, 0), rect)
+            # the edge of a hole still belongs to the closed area
+            pygame.draw.polygon(
+                background, (0xC0, 0xC0, 0xC0), points=poly.points, width=1
+            )
+        return background
 
     def draw_screen(self):
-        self.screen.fill((0, 0, 0))
-        pygame.draw.rect(self.screen, (150, 100, 10), self.border, width=1)
-        for poly in self.boundary_closed:
-            pygame.draw.polygon(self.screen, (0x40, 0x40, 0x80), points=poly.points)
-            pygame.draw.polygon(self.screen, (0xC0, 0xC0, 0xC0), points=poly.points)
+        if self.background is None:
+            self.background = self.draw_background()
+        self.screen.blit(self.background, (0, 0))
         self.draw_stix()
         self.player.draw(self.screen)
 
@@ -0,0 +1,76 @@
+"""Exact geometry for horizontal and vertical line segments.
+
+All gameplay geometry is axis-aligned, with integer coordinates. For such segments,
+the routines in `paths` only need comparisons (and one integer cross product for
+turns), so these versions work on plain tuples without creating Vectors or
+rounding. `paths` uses them automatically when all segments are axis-aligned.
+
+A segment of length zero (a single point) counts as both horizontal and vertical.
+"""
+
+
+def is_orthogonal(line):
+    """Check if a line segment is horizontal or vertical"""
+    (x0, y0), (x1, y1) = line
+    return x0 == x1 or y0 == y1
+
+
+def point_on_segment(point, line):
+    """Check if a point lies on a horizontal or vertical line segment"""
+    (x0, y0), (x1, y1) = line
+    x, y = point
+    if y0 == y1:  # horizontal
+        return y == y0 and min(x0, x1) <= x <= max(x0, x1)
+    return x == x0 and min(y0, y1) <= y <= max(y0, y1)
+
+
+def turn(line_from, line_to):
+    """Coming along `line_from`, which way do we have to turn into `line_to`?
+
+    -1: turn right, 0: straight on (or back), +1: turn left, on the screen
+    (see `paths.orientation`)
+    """
+    (f0x, f0y), (f1x, f1y) = line_from
+    (t0x, t0y), (t1x, t1y) = line_to
+    cross = (f1x - f0x) * (t1y - t0y) - (f1y - f0y) * (t1x - t0x)
+    # screen coordinates are upside down
+    return (cross < 0) - (cross > 0)
+
+
+def intersect(seg1, seg2):
+    """Intersect two horizontal or vertical line segments, see `paths.intersect_2d_segments`.
+
+    Return None, a point (x, y), or for overlapping segments on the same line a
+    segment ((x0, y0), (x1, y1)), which runs in the direction of `seg2`.
+    """
+    p0, p1 = seg1
+    q0, q1 = seg2
+    if p0 == p1:  # seg1 is a single point
+        if q0 == q1:
+            return tuple(p0) if p0 == q0 else None
+        return tuple(p0) if point_on_segment(p0, seg2) else None
+    if q0 == q1:  # seg2 is a single point
+        return tuple(q0) if point_on_segment(q0, seg1) else None
+    horizontal1 = p0[1] == p1[1]
+    horizontal2 = q0[1] == q1[1]
+    if horizontal1 != horizontal2:  # perpendicular
+        point = (q0[0], p0[1]) if horizontal1 else (p0[0], q0[1])
+        if point_on_segment(point, seg1) and point_on_segment(point, seg2):
+            return point
+        return None
+    # parallel: compare the coordinates along the common direction
+    axis, other = (0, 1) if horizontal1 else (1, 0)
+    if p0[other] != q0[other]:
+        return None
+    low = max(min(p0[axis], p1[axis]), min(q0[axis], q1[axis]))
+    high = min(max(p0[axis], p1[axis]), max(q0[axis], q1[axis]))
+    if low > high:
+        return None
+    if q0[axis] > q1[axis]:  # in the direction of seg2
+        low, high = high, low
+    start, end = [None, None], [None, None]
+    start[axis], end[axis] = low, high
+    start[other] = end[other] = p0[other]
+    if low == high:
+        return tuple(start)
+    return tuple(start), tuple(end)
@@ -1,5 +1,8 @@
 import pygame
 
+import orthogonal
+from halfedge import PlanarGraph, face_lines
+
 
 EPSILON = 0.00000001
 Vector = pygame.Vector2
@@ -9,16 +12,11 @@ def point_is_on_line(point, line):
     """Determine if given point lies on the given line
 
     This function works for horizontal and vertical lines only!"""
-    x0, y0 = line[0]
-    x1, y1 = line[1]
-    if y0 == y1:  # horizontal
-        return point[1] == y0 and min(x0, x1) <= point[0] <= max(x0, x1)
-    elif x0 == x1:  # vertical
-        return point[0] == x0 and min(y0, y1) <= point[1] <= max(y0, y1)
-    else:
+    if not orthogonal.is_orthogonal(line):
         raise ValueError(
             "point_is_on_line can only check horizontal and vertical lines"
         )
+    return orthogonal.point_on_segment(point, line)
 
 
 def lines_with_point(lines, point):
@@ -55,6 +53,8 @@ def orientation(line_from, line_to):
     """
     if line_from[1] not in line_to:
         raise ValueError(f"Lines {line_from} and {line_to} do not connect")
+    if orthogonal.is_orthogonal(line_from) and orthogonal.is_orthogonal(line_to):
+        return orthogonal.turn(line_from, line_to)
     f0 = Vector(line_from[0])
     f1 = Vector(line_from[1])
     t0 = Vector(line_to[0])
@@ -71,26 +71,23 @@ def orientation(line_from, line_to):
 
 
 def find_path(all_paths, open_loop):
-    # start with final line segment in open loop
-    finish_point = open_loop[0][0]
-    finish_line = (open_loop[0][1], open_loop[0][0])
-    starting_line = open_loop[-1]
-    starting_point = starting_line[1]
-    lines_at_start = []
-    lwps = lines_with_point(all_paths, starting_point)
-    for full_line in lwps:
-        splits = split_line_at_point(full_line, starting_point)
-        for line in splits:
-            # walk in counter-clockwise direction
-            if orientation(starting_line, line) < 0:
-                lines_at_start.append(line)
-    lwps = lines_with_point(lines_at_start, finish_point)
-    for full_line in lwps:
-        splits = split_line_at_point(full_line, finish_point)
-        for line in splits:
-            if orientation(finish_line, line) > 0:
-                lines_at_start.append(line)
-    return lines_at_start, finish_line
+    """Close the open loop (the stix) along the given paths.
+
+    Starting with the first line of the open loop, turn right as far as possible at
+    every crossing, until we are back at the start. The result is the lines around
+    the area to the right of the open loop, beginning with the open loop itself.
+
+    `all_paths` is a PlanarGraph, such as the safe paths that the game keeps up to
+    date, or a list of lines to build one from. The open loop is only added to the
+    graph for the walk, and taken out again afterwards.
+    """
+    graph = all_paths if isinstance(all_paths, PlanarGraph) else PlanarGraph(all_paths)
+    added = [piece for line in open_loop for piece in graph.add_line(*line)]
+    try:
+        return face_lines(graph.face(graph.edge(*open_loop[0])))
+    finally:
+        for piece in added:
+            graph.remove_line(*piece)
 
 
 # Python implementation of an algorithm described in:
@@ -103,7 +100,12 @@ def intersect_2d_segments(seg1, seg2):
 
     Return None if they don't intersect, a Vector if they intersect in a single
     point, or a Line (segment) if they are colinear and overlap.
+    Horizontal and vertical segments are handled exactly by `orthogonal.intersect`.
     """
+    if orthogonal.is_orthogonal(seg1) and orthogonal.is_orthogonal(seg2):
+        return orthogonal.intersect(seg1, seg2)
+    seg1 = Vector(seg1[0]), Vector(seg1[1])
+    seg2 = Vector(seg2[0]), Vector(seg2[1])
     u = Vector(Vector(seg1[1]) - Vector(seg1[0]))  # direction of seg1
     v = Vector(Vector(seg2[1]) - Vector(seg2[0]))  # direction of seg2
     w = Vector(Vector(seg1[0]) - Vector(seg2[0]))  # from base of seg2 to base of seg1
@@ -165,7 +167,7 @@ def intersect_2d_segments(seg1, seg2):
         if si < 0 or si > 1:  # no intersection with seg1
             return None
         # get the intersection parameter for seg2
-        ti = u.cross(v) / d
+        ti = u.cross(w) / d
         if ti < 0 or ti > 1:  # no intersection with seg2
             return None
         pi = seg1[0] + si * u
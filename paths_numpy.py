@@ -0,0 +1,96 @@
+import numpy as np
+
+from paths import EPSILON
+
+# Kinds of intersection returned by `intersect_2d_segments_many`
+NONE, POINT, SEGMENT = 0, 1, 2
+
+
+def _cross(a, b):
+    return a[..., 0] * b[..., 1] - a[..., 1] * b[..., 0]
+
+
+def _dot(a, b):
+    return a[..., 0] * b[..., 0] + a[..., 1] * b[..., 1]
+
+
+def _within(numerator, denominator):
+    """numerator / denominator lies in [0, 1], for denominator > 0"""
+    return (0 <= numerator) & (numerator <= denominator)
+
+
+def intersect_2d_segments_many(segments1, segments2):
+    """Intersect every segment of one batch with every segment of another.
+
+    This is the vectorized version of `paths.intersect_2d_segments`, with the same
+    results for crossing, collinear (overlapping) and degenerate (single point) segments.
+
+    :param segments1: array-like of shape (n, 2, 2), n segments ((x0, y0), (x1, y1))
+    :param segments2: array-like of shape (m, 2, 2)
+    :return: a pair of arrays: `kind` of shape (n, m), holding NONE, POINT or SEGMENT
+        for each pair of segments, and `points` of shape (n, m, 2, 2) with the
+        intersection: the two ends of an overlap, or the point twice (zeros for NONE)
+    """
+    segments1 = np.asarray(segments1, dtype=float).reshape(-1, 2, 2)
+    segments2 = np.asarray(segments2, dtype=float).reshape(-1, 2, 2)
+    a = segments1[:, np.newaxis, 0]  # (n, 1, 2)
+    u = segments1[:, np.newaxis, 1] - a  # direction of segments1
+    p = segments2[np.newaxis, :, 0]  # (1, m, 2)
+    v = segments2[np.newaxis, :, 1] - p  # direction of segments2
+    w = a - p  # from base of segments2 to base of segments1
+    d = _cross(u, v)
+    shape = d.shape
+    kind = np.full(shape, NONE, dtype=np.int8)
+    points = np.zeros(shape + (2, 2))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # skew segments intersect in a point
+        skew = abs(d) >= EPSILON
+        si = _cross(v, w) / d
+        ti = _cross(u, w) / d
+        crossing = skew & (0 <= si) & (si <= 1) & (0 <= ti) & (ti <= 1)
+        crossing_point = a + si[..., np.newaxis] * u
+        points[crossing] = crossing_point[crossing][:, np.newaxis]
+        kind[crossing] = POINT
+
+        # parallel segments must lie on the same line
+        collinear = ~skew & (_cross(u, w) == 0) & (_cross(v, w) == 0)
+        du = np.broadcast_to(_dot(u, u), shape)
+        dv = np.broadcast_to(_dot(v, v), shape)
+        t0 = _dot(w, v)  # base of segments1 on segments2, times dv
+        t1 = _dot(w + u, v)  # end of segments1 on segments2, times dv
+        # degenerate segments: single points
+        same_point = collinear & (du == 0) & (dv == 0) & np.all(w == 0, axis=-1)
+        first_point = collinear & (du == 0) & (dv != 0) & _within(t0, dv)
+        first_point |= same_point
+        second_point = collinear & (du != 0) & (dv == 0) & _within(_dot(-w, u), du)
+        points[first_point] = np.broadcast_to(a, shape + (2,))[first_point][
+            :, np.newaxis
+        ]
+        points[second_point] = np.broadcast_to(p, shape + (2,))[second_point][
+            :, np.newaxis
+        ]
+        kind[first_point | second_point] = POINT
+
+        # collinear segments: overlap, in the direction of segments2
+        lo = np.maximum(np.minimum(t0, t1) / dv, 0)
+        hi = np.minimum(np.maximum(t0, t1) / dv, 1)
+        overlap = collinear & (du != 0) & (dv != 0) & (lo <= hi)
+        ends = (
+            p[..., np.newaxis, :]
+            + np.stack((lo, hi), axis=-1)[..., np.newaxis] * v[..., np.newaxis, :]
+        )
+        points[overlap] = ends[overlap]
+        kind[overlap] = np.where(lo == hi, POINT, SEGMENT)[overlap]
+    return kind, points
+
+
+def as_intersection(kind, points):
+    """Convert one result of `intersect_2d_segments_many` into the form returned by
+    `paths.intersect_2d_segments`: None, a point (x, y) or a line ((x0, y0), (x1, y1))
+    """
+    if kind == NONE:
+        return None
+    if kind == POINT:
+        return tuple(points[0].tolist())
+    return tuple(points[0].tolist()), tuple(points[1].tolist())
@@ -0,0 +1,241 @@
+from bisect import bisect_left, bisect_right
+from collections.abc import Sequence
+from itertools import chain
+from math import isqrt
+
+# Polynomial hashing of runs of points, see `PieceTable.content_hash`
+_HASH_BASE = 1_000_003
+_HASH_MODULUS = (1 << 61) - 1
+
+
+class Buffer:
+    """An immutable run of points that any number of PieceTables can share.
+
+    `cache` holds data derived from the points (like a spatial index), so it is
+    computed only once per buffer and not again for every PieceTable using it.
+    """
+
+    __slots__ = ("points", "cache", "_positions")
+
+    def __init__(self, points):
+        self.points = tuple(points)
+        self.cache = {}
+        self._positions = None
+
+    def __len__(self):
+        return len(self.points)
+
+    def positions(self, point):
+        """All positions of `point` in this buffer, in ascending order"""
+        if self._positions is None:
+            positions = {}
+            for i, p in enumerate(self.points):
+                positions.setdefault(point_key(p), []).append(i)
+            self._positions = positions
+        return self._positions.get(point_key(point), ())
+
+    def run_hash(self, start, stop):
+        """Polynomial hash of the points [start, stop), from cached prefix hashes"""
+        if "hash" not in self.cache:
+            prefix = [0]
+            for p in self.points:
+                prefix.append(
+                    (prefix[-1] * _HASH_BASE + hash(point_key(p))) % _HASH_MODULUS
+                )
+            self.cache["hash"] = prefix
+        prefix = self.cache["hash"]
+        shift = pow(_HASH_BASE, stop - start, _HASH_MODULUS)
+        return (prefix[stop] - prefix[start] * shift) % _HASH_MODULUS
+
+
+class PieceTable(Sequence):
+    """A sequence of points, made up of pieces of shared Buffers.
+
+    Each piece is a range [start, stop) of a Buffer. Cutting a PieceTable or joining
+    several of them only copies the list of pieces, never the points themselves, so
+    taking apart and reassembling a long polyline costs time in proportion to the
+    number of pieces. Points that are new to the table go into a new Buffer.
+
+    Once there are many more pieces than needed, `flatten` copies all points into one
+    Buffer again; this happens automatically when the table is changed.
+    """
+
+    __slots__ = ("_pieces", "_ends", "_hash")
+
+    def __init__(self, points=()):
+        points = points if isinstance(points, Buffer) else Buffer(points)
+        self._set_pieces([(points, 0, len(points))])
+
+    @classmethod
+    def from_pieces(cls, pieces):
+        """Make a PieceTable from a list of pieces (buffer, start, stop)"""
+        table = cls.__new__(cls)
+        table._set_pieces(pieces)
+        return table
+
+    def _set_pieces(self, pieces):
+        self._hash = None
+        self._pieces = []
+        for buffer, start, stop in pieces:
+            if start == stop:
+                continue
+            if self._pieces:
+                last_buffer, last_start, last_stop = self._pieces[-1]
+                if last_buffer is buffer and last_stop == start:
+                    self._pieces[-1] = (buffer, last_start, stop)
+                    continue
+            self._pieces.append((buffer, start, stop))
+        self._ends = []
+        end = 0
+        for _, start, stop in self._pieces:
+            end += stop - start
+            self._ends.append(end)
+        if len(self._pieces) > 2 * isqrt(end) + 16:
+            self.flatten()
+
+    def flatten(self):
+        """Copy all points into a single new Buffer"""
+        if len(self._pieces) > 1:
+            buffer = Buffer(self)
+            self._pieces = [(buffer, 0, len(buffer))]
+            self._ends = [len(buffer)]
+
+    def pieces(self):
+        """Iterate over the pieces as (offset, buffer, start, stop),
+        where offset is the index of the piece's first point in the table"""
+        offset = 0
+        for buffer, start, stop in self._pieces:
+            yield offset, buffer, start, stop
+            offset += stop - start
+
+    def __len__(self):
+        return self._ends[-1] if self._ends else 0
+
+    def _locate(self, index):
+        """Return the piece number and the position in its buffer for `index`"""
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("PieceTable index out of range")
+        piece = bisect_right(self._ends, index)
+        buffer, start, stop = self._pieces[piece]
+        return piece, stop - (self._ends[piece] - index)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            if item.step in (None, 1):
+                # copy only the points of the slice, not the whole table
+                part = self.cut(item.start, item.stop)
+                return [
+                    point
+                    for buffer, start, stop in part._pieces
+                    for point in buffer.points[start:stop]
+                ]
+            return list(self)[item]
+        piece, position = self._locate(item)
+        return self._pieces[piece][0].points[position]
+
+    def __iter__(self):
+        return chain.from_iterable(
+            buffer.points[start:stop] for buffer, start, stop in self._pieces
+        )
+
+    def __reversed__(self):
+        return chain.from_iterable(
+            reversed(buffer.points[start:stop])
+            for buffer, start, stop in reversed(self._pieces)
+        )
+
+    def __contains__(self, item):
+        try:
+            self.index(item)
+        except ValueError:
+            return False
+        return True
+
+    def content_hash(self):
+        """A hash of the points that does not depend on how they are split into pieces.
+
+        It is computed from the cached hashes of the buffers, in time proportional
+        to the number of pieces."""
+        if self._hash is None:
+            h = 0
+            for buffer, start, stop in self._pieces:
+                h = (
+                    h * pow(_HASH_BASE, stop - start, _HASH_MODULUS)
+                    + buffer.run_hash(start, stop)
+                ) % _HASH_MODULUS
+            self._hash = h
+        return self._hash
+
+    def __eq__(self, other):
+        if isinstance(other, PieceTable):
+            if len(self) != len(other):
+                return False
+            if self._pieces == other._pieces:
+                return True
+            if self.content_hash() != other.content_hash():
+                return False
+        elif not isinstance(other, Sequence) or isinstance(other, str):
+            return NotImplemented
+        return len(self) == len(other) and all(p == q for p, q in zip(self, other))
+
+    def __repr__(self):
+        return repr(list(self))
+
+    def index(self, item):
+        """Return the first index of `item`, looking up each piece's buffer"""
+        for offset, buffer, piece_start, piece_stop in self.pieces():
+            positions = buffer.positions(item)
+            if not positions:
+                continue
+            i = bisect_left(positions, piece_start)
+            if i < len(positions) and positions[i] < piece_stop:
+                return offset + positions[i] - piece_start
+        raise ValueError(f"{item} is not in PieceTable")
+
+    def cut(self, start, stop):
+        """Return the points [start, stop) as a new PieceTable sharing this one's buffers"""
+        start, stop, _ = slice(start, stop).indices(len(self))
+        if start >= stop:
+            return PieceTable()
+        first, first_position = self._locate(start)
+        last, last_position = self._locate(stop - 1)
+        if first == last:
+            return self.from_pieces(
+                [(self._pieces[first][0], first_position, last_position + 1)]
+            )
+        head_buffer, _, head_stop = self._pieces[first]
+        tail_buffer, tail_start, _ = self._pieces[last]
+        return self.from_pieces(
+            [(head_buffer, first_position, head_stop)]
+            + self._pieces[first + 1 : last]
+            + [(tail_buffer, tail_start, last_position + 1)]
+        )
+
+    @classmethod
+    def join(cls, parts):
+        """Concatenate PieceTables and other sequences of points into a new PieceTable"""
+        pieces = []
+        for part in parts:
+            if not isinstance(part, PieceTable):
+                part = PieceTable(part)
+            pieces.extend(part._pieces)
+        return cls.from_pieces(pieces)
+
+    def insert(self, index, point):
+        """Insert a point before `index`, like list.insert"""
+        index = min(max(index + len(self) if index < 0 else index, 0), len(self))
+        self._set_pieces(
+            self.cut(0, index)._pieces
+            + [(Buffer([point]), 0, 1)]
+            + self.cut(index, len(self))._pieces
+        )
+
+    def append(self, point):
+        self.insert(len(self), point)
+
+
+def point_key(point):
+    """Points may be tuples or (unhashable) pygame.Vector2 objects"""
+    return point[0], point[1]
@@ -1,8 +1,11 @@
-from typing import List
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, defaultdict
+from itertools import chain, islice
 
 import pygame
 
 from paths import point_is_on_line, intersect_2d_segments
+from piecetable import Buffer, PieceTable, point_key
 
 
 class Polyline:
@@ -11,87 +14,223 @@ class Polyline:
 
     The implementation does not prevent the line from crossing itself,
     but things may go wrong if that happens. (not tested!)
+
+    The points are kept in a `PieceTable`, so the Polylines made by `replace`
+    (and `split`) share all unchanged runs of points with the original.
+    To find vertices and line segments quickly, each shared run of points
+    keeps a map from its vertices to their positions and an index of its
+    horizontal and vertical line segments by row and column.
+
+    The bounding box is computed once from the shared runs and then kept up to
+    date when points are inserted.
+
+    For intersection queries, the line segments are entered into a grid of square
+    cells, so a query only checks the segments in the cells that the line passes.
     """
 
-    points: List
+    _points: PieceTable
 
     def __init__(self, *args):
         if len(args) == 1:
-            self.points = list(*args)
+            points = args[0]
         else:
-            self.points = list(args)
+            points = args
+        if isinstance(points, PieceTable):
+            self._points = points.cut(0, None)  # shares the buffers
+        else:
+            self._points = PieceTable(points)
+        self._bounding_box = None
+        self._grid = None
+
+    @property
+    def points(self):
+        """The vertices as a PieceTable, which changes along with the Polyline"""
+        return self._points
 
     def __len__(self):
-        return len(self.points)
+        return len(self._points)
 
     def __getitem__(self, item):
-        return self.points[item]
+        return self._points[item]
 
     def __contains__(self, item):
-        return item in self.points
+        return item in self._points
 
     def __iter__(self):
-        return iter(self.points)
+        return iter(self._points)
 
     def __eq__(self, other):
-        return self.points == other.points
+        return self._points == other._points
 
     def __repr__(self):
-        return f"{self.__class__.__name__}({self.points!r})"
+        return f"{self.__class__.__name__}({self._points!r})"
 
     def append(self, point):
-        self.points.append(point)
+        self._points.append(point)
+        self._inserted(len(self._points) - 1)
+
+    def freeze(self):
+        """Return an immutable and hashable snapshot of this Polyline.
+
+        The snapshot shares all points (and computed properties) with this Polyline,
+        so taking one does not copy any points."""
+        return self._freeze_as(FrozenPolyline)
+
+    def _freeze_as(self, cls):
+        frozen = cls(self._points)
+        for name, value in vars(self).items():
+            if name != "_points":
+                setattr(frozen, name, value)
+        return frozen
+
+    def _inserted(self, index):
+        """Update the cached properties for the point inserted at `index`"""
+        self._grid = None
+        if self._bounding_box is not None:
+            x, y = self._points[index]
+            x0, y0, x1, y1 = self._bounding_box
+            self._bounding_box = min(x0, x), min(y0, y), max(x1, x), max(y1, y)
+
+    def bounding_box(self):
+        """Return the smallest box (x0, y0, x1, y1) that contains all points, or None"""
+        if self._bounding_box is None and len(self._points):
+            self._bounding_box = _union(
+                _buffer_bounds(buffer, start, stop)
+                for _, buffer, start, stop in self._points.pieces()
+            )
+        return self._bounding_box
 
     def index(self, item):
-        return self.points.index(item)
+        return self._points.index(item)
 
     def line_segments(self):
-        return zip(self.points, self.points[1:])
+        return zip(self._points, islice(self._points, 1, None))
+
+    def _joints(self):
+        """The line segments that connect consecutive pieces of `points`,
+        as pairs (index of the segment, segment)"""
+        pieces = list(self._points.pieces())
+        for (_, buffer, _, stop), (offset, next_buffer, next_start, _) in zip(
+            pieces, pieces[1:]
+        ):
+            yield offset - 1, (buffer.points[stop - 1], next_buffer.points[next_start])
+
+    def segment_at(self, point):
+        """Return the index of the first line segment that `point` lies on, or None"""
+        joints = dict(self._joints())
+        for offset, buffer, start, stop in self._points.pieces():
+            index = _buffer_segments(buffer)
+            if index:
+                rows, columns = index
+                x, y = point
+                # segments j of the buffer with start <= j < stop - 1 lie in this piece
+                found = [
+                    j
+                    for x0, x1, j in rows.get(y, ())
+                    if x0 <= x <= x1 and start <= j < stop - 1
+                ]
+                found += [
+                    j
+                    for y0, y1, j in columns.get(x, ())
+                    if y0 <= y <= y1 and start <= j < stop - 1
+                ]
+                if found:
+                    return offset + min(found) - start
+            else:
+                for j in range(start, stop - 1):
+                    if point_is_on_line(point, buffer.points[j : j + 2]):
+                        return offset + j - start
+            last = offset + stop - start - 1
+            if last in joints and point_is_on_line(point, joints[last]):
+                return last
+        return None
 
     def insert(self, point, after=None):
         insert_at = 0
         if after:
             insert_at = self.index(after) + 1
         else:
-            for insert_at, ls in enumerate(self.line_segments(), 1):
-                if point_is_on_line(point, ls):
-                    break
-            else:  # no suitable line segment found
+            segment = self.segment_at(point)
+            if segment is None:  # no suitable line segment found
                 raise ValueError(f"Point {point} is not on path")
-        self.points[insert_at:insert_at] = [point]
+            insert_at = segment + 1
+        self._points.insert(insert_at, point)
+        self._inserted(insert_at)
 
     def _splicepoints(self, sub_path):
-        start, end = 0, 0
-        for start, point in enumerate(self.points):
-            if sub_path[0] == point:
-                break
-        else:
-            raise ValueError("Starting point of replacement path must be on polygon")
-        for end, point in enumerate(self.points):
-            if sub_path[-1] == point:
-                break
-        else:
-            raise ValueError("End point of replacement path must be on polygon")
+        try:
+            start = self._points.index(sub_path[0])
+        except ValueError:
+            raise ValueError(
+                "Starting point of replacement path must be on polygon"
+            ) from None
+        try:
+            end = self._points.index(sub_path[-1])
+        except ValueError:
+            raise ValueError(
+                "End point of replacement path must be on polygon"
+            ) from None
         return start, end
 
     def replace(self, sub_path):
         sub_path = list(sub_path)
         start, end = self._splicepoints(sub_path)
         if start < end:
-            points = self.points[:start] + sub_path + self.points[end + 1 :]
+            points = PieceTable.join(
+                [self._points.cut(0, start), sub_path, self._points.cut(end + 1, None)]
+            )
         else:
             raise ValueError(
                 "Cannot replace a segment of original in reverse direction"
             )
-        return self.__class__(*points)
+        return self.__class__(points)
+
+    def _segment_grid(self):
+        """The line segments, and a map from grid cells to the indices
+        of the line segments that run through them"""
+        if self._grid is None:
+            segments = list(self.line_segments())
+            cells = defaultdict(list)
+            for i, segment in enumerate(segments):
+                for cell in _cells(segment):
+                    cells[cell].append(i)
+            self._grid = segments, cells
+        return self._grid
+
+    def intersections(self, line):
+        """Find all intersections of `line` with the line segments of this Polyline.
+
+        :return: a list of pairs (intersection, line segment), nearest to the start of
+            `line` first. The intersection is a point or, if the line overlaps the line
+            segment, a line segment (see `paths.intersect_2d_segments`).
+        """
+        bounding_box = self.bounding_box()
+        line_box = _points_bounds(line)
+        if bounding_box is None or _disjoint(line_box, bounding_box):
+            return []
+        segments, cells = self._segment_grid()
+        candidates = sorted(
+            {i for cell in _cells(line) for i in cells.get(cell, ())}
+        )
+        found = []
+        start = pygame.Vector2(line[0])
+        for i in candidates:
+            intersection = intersect_2d_segments(line, segments[i])
+            if intersection is None:
+                continue
+            if isinstance(intersection[0], (int, float)):  # a point
+                distance = start.distance_squared_to(intersection)
+            else:  # a line segment
+                distance = min(start.distance_squared_to(p) for p in intersection)
+            found.append((distance, i, intersection))
+        found.sort(key=lambda hit: hit[:2])
+        return [(intersection, segments[i]) for _, i, intersection in found]
 
     def intersect(self, line):
-        """"""
-        point = None
-        for segment in self.line_segments():
-            if point := intersect_2d_segments(line, segment):
-                break
-        return point
+        """Return the intersection of `line` with this Polyline that is nearest
+        to the start of `line`, or None"""
+        found = self.intersections(line)
+        return found[0][0] if found else None
 
 
 class ClosedPolyline(Polyline):
@@ -102,20 +241,85 @@ class ClosedPolyline(Polyline):
 
     In addition to the methods of `Polyline`, objects of this class
     can calculate their own area and test if a given point lies inside
-    the polygon.
+    the polygon. Like the bounding box, the area is computed once from the
+    shared runs of points and then kept up to date when points are inserted.
+
+    `surrounds_many` builds a slab index of the vertical edges: the polygon is cut
+    into horizontal slabs at the y coordinates of its vertices, and each slab knows
+    the sorted x coordinates of the edges that cross it. From then on, `surrounds`
+    finds the slab and counts the edges right of the point by bisection.
     """
 
+    def __init__(self, *args):
+        super().__init__(*args)
+        self._area = None
+        self._slabs = None
+        self._rectangles = None
+
     def line_segments(self):
-        return zip(self.points, self.points[1:] + [self.points[0]])
+        return zip(
+            self._points, chain(islice(self._points, 1, None), islice(self._points, 1))
+        )
+
+    def _joints(self):
+        yield from super()._joints()
+        if len(self._points):
+            yield len(self._points) - 1, (self._points[-1], self._points[0])
+
+    def _inserted(self, index):
+        super()._inserted(index)
+        self._slabs = None
+        self._rectangles = None
+        if self._area is not None:
+            points = self._points
+            previous, point = points[index - 1], points[index]
+            following = points[(index + 1) % len(points)]
+            self._area += (
+                _area_term(previous, point)
+                + _area_term(point, following)
+                - _area_term(previous, following)
+            )
 
     def replace(self, sub_path):
         sub_path = list(sub_path)
         start, end = self._splicepoints(sub_path)
         if start < end:
-            points = self.points[:start] + sub_path + self.points[end + 1 :]
+            points = PieceTable.join(
+                [self._points.cut(0, start), sub_path, self._points.cut(end + 1, None)]
+            )
         else:
-            points = sub_path + self.points[end + 1 : start]
-        return self.__class__(*points)
+            points = PieceTable.join([sub_path, self._points.cut(end + 1, start)])
+        return self.__class__(points)
+
+    def freeze(self):
+        return self._freeze_as(FrozenClosedPolyline)
+
+    def compact(self):
+        """Remove duplicate vertices and vertices in the middle of a horizontal or
+        vertical edge, in place. This does not change the area.
+
+        The points are kept on a stack, and a vertex is dropped as soon as the next one
+        shows it to be redundant. Runs of points left behind by an earlier `compact`
+        are known to be free of redundant vertices, so only their ends are checked.
+        """
+        kept = _Kept()
+        for _, buffer, start, stop in self._points.pieces():
+            j = start
+            if buffer.cache.get("compact"):
+                for j in range(start, min(start + 2, stop)):
+                    kept.add(buffer, j)
+                j += 1
+                if kept.ends_with(buffer, start, j):
+                    kept.extend(buffer, stop)
+                    j = stop
+            for j in range(j, stop):
+                kept.add(buffer, j)
+        kept.close()
+        self._points = PieceTable.from_pieces(kept.pieces())
+        self._bounding_box = None
+        self._grid = None
+        self._slabs = None
+        self._rectangles = None
 
     def split(self, sub_path):
         forward = self.replace(sub_path)
@@ -129,24 +333,349 @@ class ClosedPolyline(Polyline):
         but the calculation may work für negative x's, too. I just have not checked.
         """
         # add up rectangles left and right of vertical edges:
-        area = sum(p[0] * (q[1] - p[1]) for p, q in self.line_segments())
-        return area
+        if self._area is None:
+            area = sum(
+                _buffer_area_sums(buffer)[stop - 1] - _buffer_area_sums(buffer)[start]
+                for _, buffer, start, stop in self._points.pieces()
+            )
+            area += sum(_area_term(p, q) for _, (p, q) in self._joints())
+            self._area = area
+        return self._area
 
     def surrounds(self, point):
         """Check if point is inside the polygon
 
         The right and bottom edges are not considered part of the area"""
-        print(point)
         x, y = point
+        bounding_box = self.bounding_box()
+        if bounding_box is None:
+            return False
+        x0, y0, x1, y1 = bounding_box
+        if not (x0 <= x < x1 and y0 <= y < y1):
+            return False
+        if self._slabs is not None:
+            return self._slab_surrounds(x, y)
         crossing = 0
-        for line in self.line_segments():
-            if line[0][0] == line[1][0] > x:  # vertical
-                ys = sorted((line[0][1], line[1][1], y))
-                if y == ys[1] and y != ys[2]:
-                    crossing += 1
+        for (x0, y0), (x1, y1) in self.line_segments():
+            if x0 == x1 > x and min(y0, y1) <= y < max(y0, y1):  # vertical
+                crossing += 1
+        return crossing % 2 == 1
+
+    def surrounds_many(self, points):
+        """Check for each of the points if it is inside the polygon, see `surrounds`.
+
+        This builds the slab index (once), so each check takes O(log n)."""
+        self.index_slabs()
+        return [self.surrounds(point) for point in points]
+
+    def index_slabs(self):
+        """Build the slab index now, unless it exists, so `surrounds` takes O(log n)
+        until the next insert"""
+        if self._slabs is None:
+            self._slabs = self._slab_index()
+
+    def _slab_index(self):
+        """The y coordinates where slabs begin and end, and the sorted
+        x coordinates of the vertical edges that cross each slab"""
+        edges = [
+            (x0, min(y0, y1), max(y0, y1))
+            for (x0, y0), (x1, y1) in self.line_segments()
+            if x0 == x1 and y0 != y1
+        ]
+        ys = sorted({y for _, y0, y1 in edges for y in (y0, y1)})
+        slabs = [[] for _ in ys[1:]]
+        for x, y0, y1 in edges:
+            for slab in range(bisect_left(ys, y0), bisect_left(ys, y1)):
+                slabs[slab].append(x)
+        for xs in slabs:
+            xs.sort()
+        return ys, slabs
+
+    def rectangles(self):
+        """Decompose the polygon into axis-aligned rectangles (pygame.Rect).
+
+        Each slab of the slab index is cut into rectangles between pairs of vertical
+        edges, and rectangles in consecutive slabs with the same x range are merged.
+        This gives few rectangles, though not always the fewest possible.
+        The rectangles are computed once and cover the same pixels as `surrounds`.
+        """
+        if self._rectangles is None:
+            self.index_slabs()
+            ys, slabs = self._slabs
+            rectangles = []
+            started = {}  # x ranges of the rectangles being built -> their top y
+            for y, xs in zip(ys, slabs + [[]]):
+                ranges = set(zip(xs[::2], xs[1::2]))
+                for x0, x1 in sorted(set(started) - ranges):
+                    top = started.pop((x0, x1))
+                    rectangles.append(pygame.Rect(x0, top, x1 - x0, y - top))
+                for x_range in sorted(ranges - set(started)):
+                    started[x_range] = y
+            self._rectangles = rectangles
+        return self._rectangles
+
+    def _slab_surrounds(self, x, y):
+        ys, slabs = self._slabs
+        slab = bisect_right(ys, y) - 1
+        if not 0 <= slab < len(slabs):
+            return False
+        xs = slabs[slab]
+        crossing = len(xs) - bisect_right(xs, x)
         return crossing % 2 == 1
 
 
+def _buffer_segments(buffer):
+    """Line segments between consecutive points of a piecetable.Buffer by row
+    (horizontals) and column (verticals), or False if there is a diagonal one.
+
+    The segments are given by their position j in the buffer: the segment from
+    point j to point j + 1."""
+    if "segments" not in buffer.cache:
+        rows, columns = defaultdict(list), defaultdict(list)
+        points = buffer.points
+        for j, (p0, p1) in enumerate(zip(points, points[1:])):
+            if p0[1] == p1[1]:  # horizontal
+                rows[p0[1]].append((min(p0[0], p1[0]), max(p0[0], p1[0]), j))
+            elif p0[0] == p1[0]:  # vertical
+                columns[p0[0]].append((min(p0[1], p1[1]), max(p0[1], p1[1]), j))
+            else:
+                buffer.cache["segments"] = False
+                break
+        else:
+            buffer.cache["segments"] = rows, columns
+    return buffer.cache["segments"]
+
+
+class _Frozen:
+    """Makes a Polyline immutable and hashable.
+
+    Equal frozen polylines have the same hash, no matter how their points are
+    shared with other polylines. Both the hash and the area are computed only once.
+    `points` is a tuple, so the vertices cannot be changed behind its back.
+    """
+
+    @property
+    def points(self):
+        if "_tuple" not in self.__dict__:
+            self._tuple = tuple(self._points)
+        return self._tuple
+
+    def __hash__(self):
+        return self._points.content_hash()
+
+    def freeze(self):
+        return self
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError(f"{self.__class__.__name__} cannot be changed")
+
+    append = insert = compact = _immutable
+
+
+class FrozenPolyline(_Frozen, Polyline):
+    pass
+
+
+class FrozenClosedPolyline(_Frozen, ClosedPolyline):
+    """A frozen ClosedPolyline that also remembers which points it surrounds,
+    up to the last _SURROUNDS_CACHE_SIZE of them"""
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self._surrounds = OrderedDict()
+
+    def surrounds(self, point):
+        key = point_key(point)
+        if key in self._surrounds:
+            self._surrounds.move_to_end(key)
+            return self._surrounds[key]
+        inside = self._surrounds[key] = super().surrounds(point)
+        if len(self._surrounds) > _SURROUNDS_CACHE_SIZE:
+            self._surrounds.popitem(last=False)
+        return inside
+
+
+def _redundant(a, b, c):
+    """Check if b can be left out between a and c"""
+    return a == b or b == c or a[0] == b[0] == c[0] or a[1] == b[1] == c[1]
+
+
+class _Kept:
+    """The stack of vertices that `ClosedPolyline.compact` keeps,
+    as pieces (buffer, start, stop) of the original buffers"""
+
+    def __init__(self):
+        self._pieces = []
+        self.count = 0
+
+    def last(self, k):
+        """The k-th last vertex, k = 1 or 2"""
+        buffer, start, stop = self._pieces[-1]
+        if stop - start >= k:
+            return buffer.points[stop - k]
+        buffer, _, stop = self._pieces[-2]
+        return buffer.points[stop - 1]
+
+    def first(self, k):
+        """The k-th vertex, k = 1 or 2"""
+        buffer, start, stop = self._pieces[0]
+        if stop - start >= k:
+            return buffer.points[start + k - 1]
+        buffer, start, _ = self._pieces[1]
+        return buffer.points[start]
+
+    def pop(self):
+        buffer, start, stop = self._pieces.pop()
+        if stop - start > 1:
+            self._pieces.append((buffer, start, stop - 1))
+        self.count -= 1
+
+    def popleft(self):
+        buffer, start, stop = self._pieces.pop(0)
+        if stop - start > 1:
+            self._pieces.insert(0, (buffer, start + 1, stop))
+        self.count -= 1
+
+    def add(self, buffer, j):
+        point = buffer.points[j]
+        while self.count >= 2 and _redundant(self.last(2), self.last(1), point):
+            self.pop()
+        if self.count and self.last(1) == point:
+            return
+        if self.ends_with(buffer, None, j):
+            self.extend(buffer, j + 1)
+        else:
+            self._pieces.append((buffer, j, j + 1))
+            self.count += 1
+
+    def ends_with(self, buffer, start, stop):
+        """Check if the last vertices are buffer[start:stop] (any start if None)"""
+        if not self._pieces:
+            return False
+        last_buffer, last_start, last_stop = self._pieces[-1]
+        return (
+            last_buffer is buffer
+            and last_stop == stop
+            and (start is None or last_start <= start)
+        )
+
+    def extend(self, buffer, stop):
+        """Add the following vertices of the last piece's buffer up to `stop`"""
+        _, start, last_stop = self._pieces.pop()
+        self._pieces.append((buffer, start, stop))
+        self.count += stop - last_stop
+
+    def close(self):
+        """Check the vertices where the polygon closes"""
+        while self.count >= 3:
+            if _redundant(self.last(2), self.last(1), self.first(1)):
+                self.pop()
+            elif _redundant(self.last(1), self.first(1), self.first(2)):
+                self.popleft()
+            else:
+                break
+
+    def pieces(self):
+        """The kept pieces. Pieces of buffers that have not been compacted before are
+        copied into new buffers, which are free of redundant vertices now."""
+        pieces, run = [], []
+        for piece in self._pieces + [None]:
+            if piece is None or piece[0].cache.get("compact"):
+                if run:
+                    buffer = Buffer(
+                        point
+                        for buffer, start, stop in run
+                        for point in buffer.points[start:stop]
+                    )
+                    buffer.cache["compact"] = True
+                    pieces.append((buffer, 0, len(buffer)))
+                    run = []
+                if piece is not None:
+                    pieces.append(piece)
+            else:
+                run.append(piece)
+        return pieces
+
+
+def _area_term(p, q):
+    return p[0] * (q[1] - p[1])
+
+
+def _buffer_area_sums(buffer):
+    """Prefix sums of the area terms of the line segments between consecutive points
+    of a piecetable.Buffer, so the area of any run of points is a difference"""
+    if "area" not in buffer.cache:
+        sums = [0]
+        points = buffer.points
+        for p, q in zip(points, points[1:]):
+            sums.append(sums[-1] + _area_term(p, q))
+        buffer.cache["area"] = sums
+    return buffer.cache["area"]
+
+
+_BLOCK = 64  # number of points per precomputed bounding box in _buffer_bounds
+
+
+def _points_bounds(points):
+    xs = [p[0] for p in points]
+    ys = [p[1] for p in points]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def _union(boxes):
+    x0s, y0s, x1s, y1s = zip(*boxes)
+    return min(x0s), min(y0s), max(x1s), max(y1s)
+
+
+_CELL = 32  # size of the grid cells for intersection queries
+
+_SURROUNDS_CACHE_SIZE = 1024  # points remembered by FrozenClosedPolyline.surrounds
+
+
+def _cells(line):
+    """The grid cells that a line segment passes through or touches, column by
+    column; for a diagonal line, only the cells along it rather than its whole
+    bounding box"""
+    (x0, y0), (x1, y1) = sorted((tuple(line[0]), tuple(line[1])))
+    first, last = int(x0 // _CELL), int(x1 // _CELL)
+    for column in range(first, last + 1):
+        if x0 == x1:
+            ys = y0, y1
+        else:
+            # the part of the line within the column
+            left, right = max(x0, column * _CELL), min(x1, (column + 1) * _CELL)
+            ys = [y0 + (x - x0) * (y1 - y0) / (x1 - x0) for x in (left, right)]
+        low, high = int(min(ys) // _CELL), int(max(ys) // _CELL)
+        for row in range(low, high + 1):
+            yield column, row
+
+
+def _disjoint(box, other):
+    return (
+        box[2] < other[0] or other[2] < box[0] or box[3] < other[1] or other[3] < box[1]
+    )
+
+
+def _buffer_bounds(buffer, start, stop):
+    """Bounding box of the points [start, stop) of a piecetable.Buffer, using the
+    cached bounding boxes of the blocks of points that lie completely in that range"""
+    points = buffer.points
+    if "bounds" not in buffer.cache:
+        buffer.cache["bounds"] = [
+            _points_bounds(points[i : i + _BLOCK])
+            for i in range(0, len(points), _BLOCK)
+        ]
+    first_block, last_block = -(-start // _BLOCK), stop // _BLOCK
+    if first_block >= last_block:
+        return _points_bounds(points[start:stop])
+    boxes = buffer.cache["bounds"][first_block:last_block]
+    if start < first_block * _BLOCK:
+        boxes.append(_points_bounds(points[start : first_block * _BLOCK]))
+    if last_block * _BLOCK < stop:
+        boxes.append(_points_bounds(points[last_block * _BLOCK : stop]))
+    return _union(boxes)
+
+
 def rect2poly(rect: pygame.Rect):
     return ClosedPolyline(
         rect.topleft, rect.topright, rect.bottomright, rect.bottomleft
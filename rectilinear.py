@@ -0,0 +1,196 @@
+"""Boolean union of rectilinear polygons.
+
+The polygons are given as ClosedPolylines that run clockwise on the screen (positive
+area), and their interiors must not overlap. Every edge is cut into pieces between
+the end points of all edges on the same line; pieces shared by two polygons run in
+opposite directions and cancel out. The remaining pieces are joined into the outer
+boundaries (clockwise) and holes (counter-clockwise, negative area) of the union.
+
+Polygons that cross or overlap themselves or each other break these assumptions:
+`union` checks for them and raises a ValueError instead of returning a wrong outline.
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+
+from polyline import ClosedPolyline
+
+
+def union(polygons):
+    """Merge polygons that share edges.
+
+    The polygons may include the holes from an earlier union, along with their
+    outer boundaries.
+
+    :return: a list of ClosedPolylines: the outer boundaries of the merged regions
+        (positive area) and the holes in them (negative area)
+    :raises ValueError: if a polygon is not rectilinear, if the polygons overlap each
+        other or themselves, or if a counter-clockwise polygon is not a hole
+    """
+    rows, columns = defaultdict(list), defaultdict(list)
+    total_area = 0
+    for polygon in polygons:
+        total_area += polygon.area()
+        for p0, p1 in polygon.line_segments():
+            if p0[1] == p1[1] and p0[0] != p1[0]:  # horizontal
+                rows[p0[1]].append((p0[0], p1[0]))
+            elif p0[0] == p1[0] and p0[1] != p1[1]:  # vertical
+                columns[p0[0]].append((p0[1], p1[1]))
+            elif p0 != p1:
+                raise ValueError("union() can only merge rectilinear polygons")
+    _check_coverage(columns)
+    horizontals = {y: _net_intervals(edges) for y, edges in rows.items()}
+    verticals = {x: _net_intervals(edges) for x, edges in columns.items()}
+
+    # Cut the edges at the corners of the perpendicular edges, so edges only meet
+    # at their end points
+    cuts_on_row, cuts_on_column = defaultdict(set), defaultdict(set)
+    for y, intervals in horizontals.items():
+        for x0, x1, _ in intervals:
+            cuts_on_column[x0].add(y)
+            cuts_on_column[x1].add(y)
+    for x, intervals in verticals.items():
+        for y0, y1, _ in intervals:
+            cuts_on_row[y0].add(x)
+            cuts_on_row[y1].add(x)
+    outgoing = defaultdict(list)
+    for y, intervals in horizontals.items():
+        for a, b in _cut(intervals, sorted(cuts_on_row[y])):
+            outgoing[(a, y)].append((b, y))
+    for x, intervals in verticals.items():
+        for a, b in _cut(intervals, sorted(cuts_on_column[x])):
+            outgoing[(x, a)].append((x, b))
+    merged = [polygon for polygon in _trace(outgoing) if len(polygon) >= 4]
+    if sum(polygon.area() for polygon in merged) != total_area:
+        raise ValueError("union() can only merge polygons that do not overlap")
+    return merged
+
+
+def union_into(polygons, new):
+    """Add a polygon to the result of an earlier `union`.
+
+    Only the polygons whose bounding boxes touch the new one are merged again.
+    """
+    x0, y0, x1, y1 = new.bounding_box()
+    touching, apart = [], []
+    for polygon in polygons:
+        px0, py0, px1, py1 = polygon.bounding_box()
+        if px0 <= x1 and x0 <= px1 and py0 <= y1 and y0 <= py1:
+            touching.append(polygon)
+        else:
+            apart.append(polygon)
+    return apart + union(touching + [new])
+
+
+def _check_coverage(columns):
+    """Check that no point is covered twice, or covered by a counter-clockwise part.
+
+    The vertical edges (given per x as (start, end)) cut the plane into horizontal
+    slabs. Crossing an edge that points up enters a clockwise polygon, one pointing
+    down leaves it, so going from left to right through a slab, the number of
+    polygons we are in must always be 0 or 1. Where two edges lie on top of each
+    other, the one leaving a polygon counts first.
+    """
+    starting, ending = defaultdict(list), defaultdict(list)
+    for x, segments in columns.items():
+        for start, end in segments:
+            edge = (x, 1 if end < start else -1, min(start, end), max(start, end))
+            starting[edge[2]].append(edge)
+            ending[edge[3]].append(edge)
+    active = []  # the edges crossing the current slab, sorted by x
+    for y in sorted(starting.keys() | ending.keys()):
+        for edge in ending[y]:
+            del active[bisect_left(active, edge)]
+        for edge in starting[y]:
+            insort(active, edge)
+        level = 0
+        for _, direction, _, _ in active:
+            level += direction
+            if level not in (0, 1):
+                raise ValueError("union() can only merge polygons that do not overlap")
+
+
+def _net_intervals(edges):
+    """Add up directed edges (start, end) on one line.
+
+    :return: the sorted, non-overlapping intervals (low, high, direction) where the
+        edges do not cancel out; direction is +1 (ascending) or -1 (descending)
+    :raises ValueError: where edges in the same direction overlap
+    """
+    changes = defaultdict(int)
+    for start, end in edges:
+        direction = 1 if end > start else -1
+        low, high = sorted((start, end))
+        changes[low] += direction
+        changes[high] -= direction
+    intervals = []
+    level = 0
+    coords = sorted(changes)
+    for low, high in zip(coords, coords[1:]):
+        level += changes[low]
+        if abs(level) > 1:
+            raise ValueError("union() can only merge polygons that do not overlap")
+        if level:
+            direction = 1 if level > 0 else -1
+            if intervals and intervals[-1][1] == low and intervals[-1][2] == direction:
+                intervals[-1] = (intervals[-1][0], high, direction)
+            else:
+                intervals.append((low, high, direction))
+    return intervals
+
+
+def _cut(intervals, cuts):
+    """Cut directed intervals at the given (sorted) coordinates.
+
+    :return: the pieces as (start, end) in the direction of their interval
+    """
+    for low, high, direction in intervals:
+        inner = cuts[bisect_right(cuts, low) : bisect_left(cuts, high)]
+        coords = [low] + inner + [high]
+        pieces = zip(coords, coords[1:])
+        if direction > 0:
+            yield from pieces
+        else:
+            yield from ((b, a) for a, b in reversed(list(pieces)))
+
+
+def _turns(dx, dy):
+    """Directions to continue in, preferring right turns (on the screen, y points down)"""
+    return (-dy, dx), (dx, dy), (dy, -dx), (-dx, -dy)
+
+
+def _sign(value):
+    return (value > 0) - (value < 0)
+
+
+def _trace(outgoing):
+    """Join edges into closed polygons.
+
+    Where two regions touch at a corner, turning right keeps them apart.
+    """
+    polygons = []
+    for start in list(outgoing):
+        while outgoing[start]:
+            points = [start]
+            point = outgoing[start].pop()
+            direction = (_sign(point[0] - start[0]), _sign(point[1] - start[1]))
+            while point != start:
+                points.append(point)
+                ends = outgoing[point]
+                for dx, dy in _turns(*direction):
+                    found = [
+                        end
+                        for end in ends
+                        if (_sign(end[0] - point[0]), _sign(end[1] - point[1]))
+                        == (dx, dy)
+                    ]
+                    if found:
+                        break
+                else:
+                    raise ValueError("union() cannot trace the edges into polygons")
+                ends.remove(found[0])
+                point, direction = found[0], (dx, dy)
+            polygon = ClosedPolyline(points)
+            polygon.compact()
+            polygons.append(polygon)
+    return polygons
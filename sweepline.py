@@ -0,0 +1,224 @@
+"""Find all intersections between horizontal and vertical line segments in one sweep.
+
+The sweep line moves from left to right over the x coordinates where something
+happens: a horizontal segment starts or ends, or vertical segments lie there.
+The horizontal segments that the sweep line currently crosses are kept sorted by
+their y coordinate, so each vertical segment finds the horizontals it meets by
+bisection. That takes O(n log n + k) comparisons for n segments and k intersections,
+instead of checking every pair of segments. The sorted list of active horizontals
+is a plain list, so each insertion or removal also moves up to n references
+(a fast memmove, but O(n) in the worst case).
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from heapq import heappop, heappush
+from math import inf
+
+# Order of the events at the same x coordinate: a horizontal segment must be active
+# when a vertical segment at its start or end point is checked.
+_START, _VERTICAL, _END = 0, 1, 2
+
+
+def _horizontal(y, x0, x1):
+    return (x0, y), (x1, y)
+
+
+def _vertical(x, y0, y1):
+    return (x, y0), (x, y1)
+
+
+def _first_point(intersection):
+    """The first point of a point or line intersection"""
+    return (
+        intersection if isinstance(intersection[0], (int, float)) else intersection[0]
+    )
+
+
+def intersections(first, second=None):
+    """Find all intersections between two sets of line segments.
+
+    Each set is given as a pair of LineStores (horizontals, verticals), e.g. the stix
+    and the edges of the open area. Without `second`, the horizontals of `first` are
+    checked against its own verticals instead; this includes the corners of a polyline.
+    (Parallel segments within one LineStore are merged, so they never overlap.)
+
+    :return: a list of triples (intersection, line_a, line_b), ordered by the first point
+        of the intersection. As with `linestore.line_intersect`, the intersection is a point
+        (x, y) or, for overlapping parallel segments, a line ((x0, y0), (x1, y1)).
+        line_a is the segment of `first` and line_b the segment of `second`. When checking
+        a single set, line_a is the horizontal and line_b the vertical segment.
+    """
+    single = second is None
+    sets = [first] if single else [first, second]
+    events = []
+    verticals_at = defaultdict(lambda: ([], []))  # x -> verticals (y0, y1) of each set
+    for tag, (horizontals, verticals) in enumerate(sets):
+        for y, x0, x1 in horizontals.segments():
+            events.append((x0, _START, tag, (y, x0, x1)))
+            events.append((x1, _END, tag, (y, x0, x1)))
+        for x, y0, y1 in verticals.segments():
+            if x not in verticals_at:
+                events.append((x, _VERTICAL, None, None))
+            verticals_at[x][tag].append((y0, y1))
+    events.sort(key=lambda event: event[:2])
+
+    result = []
+    # horizontals (y, x0, x1) that the sweep line crosses, for each set
+    active = ([], [])
+    for x, kind, tag, horizontal in events:
+        if kind == _START:
+            if not single:
+                result.extend(_overlaps_on_row(horizontal, tag, active[1 - tag]))
+            insort(active[tag], horizontal)
+        elif kind == _END:
+            del active[tag][bisect_left(active[tag], horizontal)]
+        else:
+            result.extend(_crossings_at(x, verticals_at[x], active, single))
+            if not single:
+                result.extend(_overlaps_on_column(x, *verticals_at[x]))
+    result.sort(key=lambda found: _first_point(found[0]))
+    return result
+
+
+def _overlaps_on_row(horizontal, tag, others):
+    """Overlaps of a horizontal that starts now with the active horizontals of the other set.
+
+    Those started earlier (or at the same x) and have not ended yet, so every one on the
+    same y overlaps the new segment. Segments that start later report the overlap themselves.
+    """
+    y, x0, x1 = horizontal
+    lo = bisect_left(others, (y,))
+    hi = bisect_right(others, (y, inf))
+    for other in others[lo:hi]:
+        _, other_x0, other_x1 = other
+        i_x0, i_x1 = x0, min(x1, other_x1)
+        found = (i_x0, y) if i_x0 == i_x1 else ((i_x0, y), (i_x1, y))
+        lines = [_horizontal(*horizontal), _horizontal(*other)]
+        if tag == 1:
+            lines.reverse()
+        yield (found, *lines)
+
+
+def _crossings_at(x, verticals, active, single):
+    """Crossings of the verticals at x with the active horizontals"""
+    for tag, segments in enumerate(verticals):
+        # check against the own horizontals, or those of the other set
+        horizontals = active[0] if single else active[1 - tag]
+        for y0, y1 in segments:
+            lo = bisect_left(horizontals, (y0,))
+            hi = bisect_right(horizontals, (y1, inf))
+            for horizontal in horizontals[lo:hi]:
+                lines = [_horizontal(*horizontal), _vertical(x, y0, y1)]
+                if tag == 0 and not single:
+                    lines.reverse()
+                yield ((x, horizontal[0]), *lines)
+
+
+def _overlaps_on_column(x, verticals, others):
+    """Overlaps of the verticals of both sets at x.
+
+    Both lists are sorted and free of overlaps within themselves, so one merge pass finds all.
+    """
+    i = j = 0
+    while i < len(verticals) and j < len(others):
+        y0, y1 = verticals[i]
+        other_y0, other_y1 = others[j]
+        i_y0, i_y1 = max(y0, other_y0), min(y1, other_y1)
+        if i_y0 <= i_y1:
+            found = (x, i_y0) if i_y0 == i_y1 else ((x, i_y0), (x, i_y1))
+            yield found, _vertical(x, y0, y1), _vertical(x, other_y0, other_y1)
+        # move on with the segment that ends first
+        if y1 < other_y1:
+            i += 1
+        else:
+            j += 1
+
+
+def self_intersections(points):
+    """Find where a polyline of horizontal and vertical segments touches, crosses or
+    runs along itself.
+
+    The segments are checked as they are, not merged. Consecutive segments that only
+    share the point joining them are not reported, but a segment that doubles back
+    along the previous one is. A vertex visited again is reported as a point.
+
+    :return: a sorted list of points (x, y) and, where segments overlap, lines
+        ((x0, y0), (x1, y1)) with ascending coordinates. Points that lie on a
+        reported overlap are left out.
+    """
+    points = [tuple(point) for point in points]
+    points = [p for i, p in enumerate(points) if i == 0 or p != points[i - 1]]
+    rows, columns = defaultdict(list), defaultdict(list)
+    for i, ((x0, y0), (x1, y1)) in enumerate(zip(points, points[1:])):
+        if y0 == y1:
+            rows[y0].append((min(x0, x1), max(x0, x1), i))
+        elif x0 == x1:
+            columns[x0].append((min(y0, y1), max(y0, y1), i))
+        else:
+            raise ValueError(
+                "self_intersections only takes horizontal and vertical lines"
+            )
+
+    found = set()
+    for y, segments in rows.items():
+        for low, high in _collinear_overlaps(segments):
+            found.add((low, y) if low == high else ((low, y), (high, y)))
+    for x, segments in columns.items():
+        for low, high in _collinear_overlaps(segments):
+            found.add((x, low) if low == high else ((x, low), (x, high)))
+
+    # Horizontals against verticals; perpendicular neighbours only meet in their
+    # joining point
+    events = []
+    for y, segments in rows.items():
+        for x0, x1, i in segments:
+            events.append((x0, _START, (y, x0, x1, i)))
+            events.append((x1, _END, (y, x0, x1, i)))
+    for x in columns:
+        events.append((x, _VERTICAL, None))
+    events.sort(key=lambda event: event[:2])
+    active = []
+    for x, kind, horizontal in events:
+        if kind == _START:
+            insort(active, horizontal)
+        elif kind == _END:
+            del active[bisect_left(active, horizontal)]
+        else:
+            for y0, y1, i in columns[x]:
+                lo = bisect_left(active, (y0,))
+                hi = bisect_right(active, (y1, inf))
+                for y, _, _, j in active[lo:hi]:
+                    if abs(i - j) != 1:
+                        found.add((x, y))
+
+    overlaps = [item for item in found if not isinstance(item[0], (int, float))]
+    points = [
+        item
+        for item in found
+        if isinstance(item[0], (int, float))
+        and not any(_point_on_line(item, line) for line in overlaps)
+    ]
+    return sorted(overlaps + points, key=_first_point)
+
+
+def _collinear_overlaps(segments):
+    """Overlaps (low, high) between segments (low, high, index) on the same line.
+
+    Neighbouring segments that only share their joining point are skipped.
+    """
+    active = []  # heap of (high, low, index) of the segments that may still overlap
+    for low, high, i in sorted(segments):
+        while active and active[0][0] < low:
+            heappop(active)
+        for other_high, _, j in active:
+            end = min(high, other_high)
+            if abs(i - j) == 1 and low == end:
+                continue  # just the joining point
+            yield low, end
+        heappush(active, (high, low, i))
+
+
+def _point_on_line(point, line):
+    (x0, y0), (x1, y1) = line
+    return x0 <= point[0] <= x1 and y0 <= point[1] <= y1
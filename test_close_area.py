@@ -1,6 +1,7 @@
 import pygame
 import pytest
 
+from halfedge import PlanarGraph
 from paths import (
     lines_with_point,
     point_is_on_line,
@@ -189,3 +190,11 @@ def test_find_path(boundary_rectangular):
         ((0, 30), (0, 20)),
     ]
     assert find_path(boundary_rectangular, stix_as_lines) == closed
+
+
+def test_find_path_leaves_the_graph_as_it_was(boundary_rectangular):
+    graph = PlanarGraph(boundary_rectangular)
+    before = {edge.line for edge in graph.half_edges()}
+    stix_as_lines = [((0, 20), (20, 20)), ((20, 20), (20, 30)), ((20, 30), (0, 30))]
+    assert find_path(graph, stix_as_lines)[-1] == ((0, 30), (0, 20))
+    assert {edge.line for edge in graph.half_edges()} == before
@@ -1,6 +1,8 @@
+import pygame
 import pytest
 
-from polyline import ClosedPolyline
+import polyline
+from polyline import ClosedPolyline, FrozenClosedPolyline
 
 
 def test_polygon_init_empty():
@@ -316,3 +318,214 @@ def test_polygon_area_reversed_is_negative():
     points = reversed([(0, 0), (10, 0), (10, 10), (0, 10)])
     path = ClosedPolyline(*points)
     assert path.area() == -100
+
+
+def test_polygon_segment_at():
+    points = [(0, 0), (10, 0), (10, 10), (0, 10)]
+    path = ClosedPolyline(*points)
+    assert path.segment_at((5, 0)) == 0
+    assert path.segment_at((10, 0)) == 0  # first segment with this point
+    assert path.segment_at((10, 5)) == 1
+    assert path.segment_at((0, 5)) == 3  # the closing segment
+    assert path.segment_at((5, 5)) is None
+
+
+def test_polygon_index_after_insert():
+    points = [(0, 0), (10, 0), (10, 10), (0, 10)]
+    path = ClosedPolyline(*points)
+    assert path.index((10, 10)) == 2
+    path.insert((10, 5))
+    assert path.index((10, 10)) == 3
+    assert path.index(pygame.Vector2(10, 5)) == 2
+    assert (10, 5) in path
+    with pytest.raises(ValueError):
+        path.index((5, 5))
+
+
+def test_polygon_split_shares_points_with_original():
+    points = [(0, 0), (10, 0), (10, 10), (0, 10)] + [(0, y) for y in range(9, 0, -1)]
+    path = ClosedPolyline(*points)
+    forward, backward = path.split([(10, 0), (5, 0), (5, 10), (10, 10)])
+    original = next(path.points.pieces())[1]
+    assert any(buffer is original for _, buffer, _, _ in forward.points.pieces())
+    assert forward.segment_at((0, 5)) == 9
+    assert forward.index((0, 1)) == 14
+    assert forward.segment_at((0, 0)) == 0
+    assert forward.segment_at((0, 0.5)) == 14  # the closing segment
+
+
+def test_polygon_area_is_kept_up_to_date():
+    path = ClosedPolyline((0, 0), (10, 0), (10, 10), (0, 10))
+    assert path.area() == 100
+    path.insert((10, 5))  # on a line segment: area does not change
+    assert path.area() == 100
+    path.insert((15, 5), after=(10, 5))
+    path.insert((15, 10), after=(15, 5))  # adds a 5x5 square
+    assert path.area() == 100 + 25
+    path.append((0, 5))
+    assert path.area() == 125
+    forward, backward = path.split([(10, 0), (5, 0), (5, 10), (0, 10)])
+    assert forward.area() + backward.area() == path.area()
+
+
+def test_polygon_bounding_box():
+    points = [(0, 0), (10, 0), (10, 3), (5, 3), (5, 8), (10, 8), (10, 10), (0, 10)]
+    path = ClosedPolyline(*points)
+    assert path.bounding_box() == (0, 0, 10, 10)
+    path.insert((20, 9), after=(10, 8))
+    assert path.bounding_box() == (0, 0, 20, 10)
+    assert ClosedPolyline().bounding_box() is None
+
+
+def test_polygon_bounding_box_of_split_polygon():
+    points = [(x, 0) for x in range(0, 200, 2)] + [(200, 0), (200, 10), (0, 10)]
+    path = ClosedPolyline(*points)
+    path.insert((100, 10))
+    forward, backward = path.split([(100, 0), (100, 10)])
+    assert forward.bounding_box() == (0, 0, 100, 10)
+    assert backward.bounding_box() == (100, 0, 200, 10)
+
+
+@pytest.mark.parametrize(
+    "points",
+    [
+        [(0, 0), (10, 0), (10, 10), (0, 10)],
+        [(0, 0), (10, 0), (10, 3), (5, 3), (5, 8), (10, 8), (10, 10), (0, 10)],
+        [(0, 0), (4, 0), (4, 6), (6, 6), (6, 0), (10, 0), (10, 10), (0, 10)],
+    ],
+)
+def test_polygon_surrounds_many(points):
+    path = ClosedPolyline(*points)
+    grid = [(x, y) for x in range(-1, 12) for y in range(-1, 12)]
+    expected = [path.surrounds(point) for point in grid]
+    assert path.surrounds_many(grid) == expected
+    # with the slab index built, surrounds uses it
+    assert [path.surrounds(point) for point in grid] == expected
+    assert path.surrounds_many([(2.5, 9.5), (10.5, 5)]) == [True, False]
+
+
+def test_polygon_index_slabs():
+    path = ClosedPolyline((0, 0), (10, 0), (10, 10), (0, 10))
+    path.index_slabs()
+    assert path.surrounds((5, 5))
+    assert not path.surrounds((5, 10))
+    path.insert((10, 4))
+    path.insert((15, 4), after=(10, 4))
+    path.insert((15, 6), after=(15, 4))
+    path.insert((10, 6), after=(15, 6))
+    path.index_slabs()
+    assert path.surrounds((12, 5))
+
+
+def test_polygon_surrounds_many_after_insert():
+    path = ClosedPolyline((0, 0), (10, 0), (10, 10), (0, 10))
+    assert path.surrounds_many([(12, 5)]) == [False]
+    path.insert((10, 4))
+    path.insert((15, 4), after=(10, 4))
+    path.insert((15, 6), after=(15, 4))
+    path.insert((10, 6), after=(15, 6))
+    assert path.surrounds_many([(12, 5), (12, 7)]) == [True, False]
+
+
+def test_polygon_compact():
+    points = [(0, 0), (5, 0), (10, 0), (10, 10), (10, 10), (3, 10), (6, 10), (0, 10)]
+    path = ClosedPolyline(*points)
+    path.compact()
+    assert path.points == [(0, 0), (10, 0), (10, 10), (0, 10)]
+    assert path.area() == 100
+
+
+def test_polygon_compact_across_the_closing_point():
+    path = ClosedPolyline((5, 0), (10, 0), (10, 10), (0, 10), (0, 0))
+    path.compact()
+    assert path.points == [(10, 0), (10, 10), (0, 10), (0, 0)]
+
+
+def test_polygon_compact_after_split():
+    path = ClosedPolyline((0, 0), (10, 0), (10, 10), (0, 10))
+    path.compact()
+    path.insert((5, 0))
+    path.insert((5, 10))
+    forward, backward = path.split([(5, 0), (5, 10)])
+    forward.compact()
+    backward.compact()
+    assert forward.points == [(0, 0), (5, 0), (5, 10), (0, 10)]
+    assert backward.points == [(5, 10), (5, 0), (10, 0), (10, 10)]
+    assert forward.area() + backward.area() == 100
+
+
+def test_polygon_freeze():
+    path = ClosedPolyline((0, 0), (10, 0), (10, 10), (0, 10))
+    frozen = path.freeze()
+    assert frozen == path
+    assert frozen.area() == 100
+    path.insert((10, 5))
+    path.insert((15, 5), after=(10, 5))
+    assert len(frozen) == 4  # the snapshot does not change with the original
+    assert frozen.area() == 100
+    with pytest.raises(TypeError):
+        frozen.insert((5, 0))
+    with pytest.raises(TypeError):
+        frozen.compact()
+
+
+def test_frozen_polygons_are_hashable():
+    points = [(0, 0), (10, 0), (10, 10), (0, 10)]
+    path = ClosedPolyline(*points)
+    path.insert((5, 0))
+    first, _ = path.split([(5, 0), (5, 10), (0, 10)])
+    # same points, made up of different pieces
+    same = ClosedPolyline((0, 0), (5, 0), (5, 10), (0, 10)).freeze()
+    assert first.freeze() == same
+    assert hash(first.freeze()) == hash(same)
+    assert len({first.freeze(), same, path.freeze()}) == 2
+    with pytest.raises(TypeError):
+        hash(path)
+
+
+def test_frozen_polygon_operations_return_frozen_polygons():
+    frozen = ClosedPolyline((0, 0), (10, 0), (10, 10), (0, 10)).freeze()
+    forward, backward = frozen.split([(10, 0), (0, 10)])
+    assert isinstance(forward, FrozenClosedPolyline)
+    assert frozen.surrounds((5, 5))
+    assert frozen.surrounds_many([(5, 5), (15, 5)]) == [True, False]
+
+
+def test_frozen_polygon_points_are_a_tuple():
+    path = ClosedPolyline((0, 0), (10, 0), (10, 10), (0, 10))
+    frozen = path.freeze()
+    assert frozen.points == ((0, 0), (10, 0), (10, 10), (0, 10))
+    with pytest.raises(AttributeError):
+        frozen.points.append((0, 5))
+    path.insert((10, 5))
+    assert frozen.points == ((0, 0), (10, 0), (10, 10), (0, 10))
+
+
+def test_frozen_polygon_remembers_a_bounded_number_of_points(monkeypatch):
+    monkeypatch.setattr(polyline, "_SURROUNDS_CACHE_SIZE", 2)
+    frozen = ClosedPolyline((0, 0), (10, 0), (10, 10), (0, 10)).freeze()
+    assert frozen.surrounds((1, 1))
+    assert not frozen.surrounds((20, 1))
+    assert frozen.surrounds((1, 1))  # now the most recently used
+    assert frozen.surrounds((2, 2))
+    assert list(frozen._surrounds) == [(1, 1), (2, 2)]
+
+
+def test_polygon_rectangles():
+    points = [(0, 0), (10, 0), (10, 3), (5, 3), (5, 8), (10, 8), (10, 10), (0, 10)]
+    path = ClosedPolyline(*points)
+    rectangles = path.rectangles()
+    assert sorted(rectangles) == sorted(
+        [pygame.Rect(0, 0, 10, 3), pygame.Rect(0, 3, 5, 5), pygame.Rect(0, 8, 10, 2)]
+    )
+    assert sum(r.width * r.height for r in rectangles) == path.area()
+    for x in range(-1, 12):
+        for y in range(-1, 12):
+            covered = any(r.collidepoint(x, y) for r in rectangles)
+            assert covered == path.surrounds((x, y))
+
+
+def test_polygon_rectangles_in_two_slabs():
+    points = [(0, 0), (10, 0), (10, 10), (5, 10), (5, 5), (0, 5)]
+    path = ClosedPolyline(*points)
+    assert path.rectangles() == [pygame.Rect(0, 0, 10, 5), pygame.Rect(5, 5, 5, 5)]
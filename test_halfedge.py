@@ -0,0 +1,130 @@
+import pytest
+
+from halfedge import PlanarGraph, face_lines
+
+
+@pytest.fixture
+def rectangle_with_stix():
+    b = [(0, 0), (0, 50), (40, 50), (40, 0), (0, 0)]
+    stix = [((0, 20), (20, 20)), ((20, 20), (20, 30)), ((20, 30), (0, 30))]
+    return PlanarGraph(list(zip(b, b[1:])) + stix)
+
+
+def test_vertices_at_ends_and_junctions(rectangle_with_stix):
+    graph = rectangle_with_stix
+    assert len(graph) == 8
+    assert graph.vertex((0, 20)) is not None
+    assert graph.vertex((0, 25)) is None
+    assert set(graph.vertex((0, 30)).edges) == {(1, 0), (0, -1), (0, 1)}
+
+
+def test_twins_and_next(rectangle_with_stix):
+    graph = rectangle_with_stix
+    edge = graph.edge((20, 30), (0, 30))
+    assert edge.line == ((20, 30), (0, 30))
+    assert edge.twin.line == ((0, 30), (20, 30))
+    assert edge.next.line == ((0, 30), (0, 20))  # turn right
+    assert edge.next.prev is edge
+    assert edge.twin.next.line == ((20, 30), (20, 20))
+
+
+def test_edge_towards_far_point(rectangle_with_stix):
+    edge = rectangle_with_stix.edge((0, 0), (0, 50))
+    assert edge.line == ((0, 0), (0, 20))
+    assert rectangle_with_stix.edge((0, 20), (-5, 20)) is None
+    assert rectangle_with_stix.edge((3, 3), (0, 0)) is None
+
+
+def test_face_to_the_right(rectangle_with_stix):
+    first = rectangle_with_stix.edge((0, 20), (20, 20))
+    assert face_lines(PlanarGraph.face(first)) == [
+        ((0, 20), (20, 20)),
+        ((20, 20), (20, 30)),
+        ((20, 30), (0, 30)),
+        ((0, 30), (0, 20)),
+    ]
+
+
+def test_faces(rectangle_with_stix):
+    faces = list(rectangle_with_stix.faces())
+    assert len(faces) == 3  # the stix area, the rest and the outside
+    assert sum(len(face) for face in faces) == 2 * 9
+    rest = face_lines(PlanarGraph.face(rectangle_with_stix.edge((0, 0), (40, 0))))
+    assert rest == [
+        ((0, 0), (40, 0)),
+        ((40, 0), (40, 50)),
+        ((40, 50), (0, 50)),
+        ((0, 50), (0, 30)),
+        ((0, 30), (20, 30)),
+        ((20, 30), (20, 20)),
+        ((20, 20), (0, 20)),
+        ((0, 20), (0, 0)),
+    ]
+    outside = face_lines(PlanarGraph.face(rectangle_with_stix.edge((40, 0), (0, 0))))
+    assert outside == [
+        ((40, 0), (0, 0)),
+        ((0, 0), (0, 50)),
+        ((0, 50), (40, 50)),
+        ((40, 50), (40, 0)),
+    ]
+
+
+def test_crossing_lines_are_cut():
+    graph = PlanarGraph([((0, 5), (10, 5)), ((5, 0), (5, 10))])
+    assert set(graph.vertex((5, 5)).edges) == {(1, 0), (-1, 0), (0, 1), (0, -1)}
+    edge = graph.edge((0, 5), (5, 5))
+    assert edge.next.line == ((5, 5), (5, 10))
+
+
+def test_dead_end_turns_back():
+    graph = PlanarGraph([((0, 0), (10, 0))])
+    edge = graph.edge((0, 0), (10, 0))
+    assert edge.next is edge.twin
+    assert edge.twin.next is edge
+
+
+def test_diagonal_lines_are_rejected():
+    with pytest.raises(ValueError):
+        PlanarGraph([((0, 0), (10, 10))])
+
+
+def half_edges(graph):
+    return {edge.line: edge.next.line for edge in graph.half_edges()}
+
+
+def test_add_line_cuts_crossed_edges(rectangle_with_stix):
+    graph = rectangle_with_stix
+    added = graph.add_line((10, 0), (10, 50))
+    assert added == [((10, 0), (10, 50))]
+    lines = [((0, 0), (0, 50)), ((0, 50), (40, 50)), ((40, 50), (40, 0))]
+    lines += [((40, 0), (0, 0)), ((0, 20), (20, 20)), ((20, 20), (20, 30))]
+    lines += [((20, 30), (0, 30)), ((10, 0), (10, 50))]
+    assert half_edges(graph) == half_edges(PlanarGraph(lines))
+    assert graph.edge((10, 20), (10, 0)).next.line == ((10, 0), (40, 0))
+
+
+def test_add_line_returns_only_new_pieces(rectangle_with_stix):
+    graph = rectangle_with_stix
+    assert graph.add_line((0, 10), (0, 40)) == []
+    assert graph.add_line((30, 60), (30, 20)) == [((30, 60), (30, 20))]
+    assert set(graph.vertex((30, 50)).edges) == {(1, 0), (-1, 0), (0, 1), (0, -1)}
+
+
+def test_remove_line_joins_edges_again(rectangle_with_stix):
+    graph = rectangle_with_stix
+    before = half_edges(graph)
+    graph.add_line((10, 0), (10, 50))
+    graph.remove_line((10, 50), (10, 0))
+    assert half_edges(graph) == before
+    assert graph.vertex((10, 20)) is None
+    assert len(graph) == 8
+
+
+def test_remove_part_of_an_edge(rectangle_with_stix):
+    graph = rectangle_with_stix
+    graph.remove_line((0, 20), (0, 30))
+    assert graph.edge((0, 30), (0, 20)) is None
+    assert set(graph.vertex((0, 30)).edges) == {(1, 0), (0, 1)}
+    graph.remove_line((10, 50), (30, 50))
+    assert graph.vertex((10, 50)).edges.keys() == {(-1, 0)}
+    assert graph.edge((10, 50), (0, 50)).next.line == ((0, 50), (0, 30))
@@ -1,6 +1,16 @@
+import pygame
 import pytest
 
-from linestore import LineStore, polyline2linesegments, line_intersect
+from linestore import (
+    LineStore,
+    polyline2linesegments,
+    line_intersect,
+    simplify_one_coord,
+    decompose_polyline,
+    StixStore,
+    LineRow,
+    decompose_rects,
+)
 from pygame.math import Vector2
 
 
@@ -96,6 +106,211 @@ def test_linestore_add_simplify2():
     assert (4, 10) in ls.lines[5]
 
 
+def test_linestore_add_merges_on_insert():
+    """Overlapping or touching segments are merged as soon as they are added"""
+    ls = LineStore("horizontal")
+    ls.add(((5, 1), (8, 1)))
+    ls.add(((0, 1), (2, 1)))
+    ls.add(((2, 1), (6, 1)))
+    assert ls.lines[1] == [(0, 8)]
+
+
+def test_linestore_add_keeps_segments_sorted():
+    ls = LineStore("vertical")
+    ls.add(((3, 20), (3, 25)))
+    ls.add(((3, 1), (3, 4)))
+    ls.add(((3, 10), (3, 12)))
+    assert ls.lines[3] == [(1, 4), (10, 12), (20, 25)]
+
+
+def test_linestore_add_normalizes_direction():
+    """Segments are stored from left to right (top to bottom), whichever way they were given"""
+    ls = LineStore("horizontal")
+    ls.add(((10, 2), (4, 2)))
+    assert ls.lines[2] == [(4, 10)]
+
+
+def test_linestore_add_contained_segment():
+    ls = LineStore("horizontal")
+    ls.add(((0, 2), (10, 2)))
+    ls.add(((3, 2), (4, 2)))
+    assert ls.lines[2] == [(0, 10)]
+
+
+def test_linestore_add_bridges_several_segments():
+    ls = LineStore("horizontal")
+    for line in [
+        ((0, 2), (1, 2)),
+        ((3, 2), (4, 2)),
+        ((6, 2), (7, 2)),
+        ((9, 2), (10, 2)),
+    ]:
+        ls.add(line)
+    ls.add(((1, 2), (7, 2)))
+    assert ls.lines[2] == [(0, 7), (9, 10)]
+
+
+def test_linestore_overlapping():
+    ls = LineStore("horizontal")
+    for line in [
+        ((0, 2), (1, 2)),
+        ((3, 2), (4, 2)),
+        ((6, 2), (7, 2)),
+        ((9, 2), (10, 2)),
+    ]:
+        ls.add(line)
+    assert ls.overlapping(2, 1, 6) == [(0, 1), (3, 4), (6, 7)]
+    assert ls.overlapping(2, 8, 8) == []
+    assert ls.overlapping(5, 0, 10) == []
+
+
+def test_linestore_find():
+    ls = LineStore("vertical")
+    ls.add(((3, 1), (3, 4)))
+    ls.add(((3, 10), (3, 12)))
+    assert ls.find(3, 4) == (1, 4)
+    assert ls.find(3, 11) == (10, 12)
+    assert ls.find(3, 5) is None
+    assert ls.find(7, 5) is None
+
+
+def test_linestore_keys_between():
+    ls = LineStore("vertical")
+    ls.add(((7, 0), (7, 5)))
+    ls.add(((3, 1), (3, 4)))
+    ls.add(((5, 6), (5, 10)))
+    ls.add(((12, 6), (12, 10)))
+    assert ls.keys_between(3, 7) == [3, 5, 7]
+    assert ls.keys_between(4, 11) == [5, 7]
+    assert ls.keys_between(13, 20) == []
+
+
+def test_linestore_keys_between_skips_empty_keys():
+    """Looking up a key without segments does not make it show up in range queries"""
+    ls = LineStore("horizontal")
+    ls.add(((0, 2), (4, 2)))
+    ls.get_lines(3)
+    assert ls.keys_between(0, 10) == [2]
+
+
+def test_simplify_one_coord_contained_segment():
+    assert simplify_one_coord([(0, 10), (2, 3)]) == [(0, 10)]
+
+
+def test_linestore_without_auto_simplify_keeps_segments():
+    """Without auto_simplify, overlapping segments are kept (sorted) until simplify() is called"""
+    ls = LineStore("vertical", auto_simplify=False)
+    ls.add(((5, 4), (5, 10)))
+    ls.add(((5, 1), (5, 5)))
+    assert ls.lines[5] == [(1, 5), (4, 10)]
+    ls.simplify()
+    assert ls.lines[5] == [(1, 10)]
+
+
+def test_linestore_simplify_skips_clean_keys():
+    """simplify() without a key only merges the keys that changed since the last call"""
+    ls = LineStore("vertical", auto_simplify=False)
+    ls.add(((5, 1), (5, 5)))
+    ls.add(((6, 1), (6, 5)))
+    ls.simplify()
+    ls.lines[5].append((2, 3))  # modified directly, not marked dirty
+    ls.add(((6, 4), (6, 10)))
+    ls.simplify()
+    assert ls.lines[5] == [(1, 5), (2, 3)]
+    assert ls.lines[6] == [(1, 10)]
+    ls.simplify(5)
+    assert ls.lines[5] == [(1, 5)]
+
+
+def test_linestore_lookups_merge_dirty_keys():
+    ls = LineStore("horizontal", auto_simplify=False)
+    ls.add(((0, 1), (4, 1)))
+    ls.add(((3, 1), (8, 1)))
+    assert ls.find(1, 6) == (0, 8)
+    assert line_intersect(((5, 1), (6, 1)), ls) == ((5, 1), (6, 1))
+
+
+def test_linestore_remove_splits_segment():
+    ls = LineStore("horizontal")
+    ls.add(((0, 2), (10, 2)))
+    ls.remove(((5, 2), (3, 2)))
+    assert ls.lines[2] == [(0, 3), (5, 10)]
+
+
+def test_linestore_remove_whole_segments():
+    """Removing all segments of a key removes the key"""
+    ls = LineStore("vertical")
+    ls.add(((3, 1), (3, 4)))
+    ls.add(((3, 10), (3, 12)))
+    ls.add(((5, 1), (5, 4)))
+    ls.remove(((3, 0), (3, 12)))
+    assert 3 not in ls.lines
+    assert ls.keys_between(0, 10) == [5]
+    assert not line_intersect(((0, 2), (4, 2)), ls)
+
+
+def test_linestore_subtract_across_segments():
+    ls = LineStore("horizontal")
+    for line in [((0, 2), (4, 2)), ((6, 2), (8, 2)), ((10, 2), (14, 2))]:
+        ls.add(line)
+    ls.subtract(2, 2, 12)
+    assert ls.lines[2] == [(0, 2), (12, 14)]
+
+
+def test_linestore_subtract_keeps_touching_segments():
+    ls = LineStore("horizontal")
+    ls.add(((0, 2), (4, 2)))
+    ls.add(((8, 2), (10, 2)))
+    ls.subtract(2, 4, 8)
+    assert ls.lines[2] == [(0, 4), (8, 10)]
+
+
+def test_linestore_subtract_point_does_nothing():
+    ls = LineStore("horizontal")
+    ls.add(((0, 2), (4, 2)))
+    ls.subtract(2, 3, 3)
+    ls.subtract(5, 0, 10)
+    assert ls.lines[2] == [(0, 4)]
+
+
+def test_linestore_subtract_keeps_points_on_the_ends():
+    ls = LineStore("horizontal")
+    for line in [((3, 2), (3, 2)), ((4, 2), (4, 2)), ((5, 2), (5, 2))]:
+        ls.add(line)
+    ls.subtract(2, 3, 5)
+    assert ls.lines[2] == [(3, 3), (5, 5)]
+    ls.subtract(2, 0, 4)
+    assert ls.lines[2] == [(5, 5)]
+
+
+def test_line_row():
+    row = LineRow([(1, 3), (5, 10)])
+    assert len(row) == 2
+    assert row[1] == (5, 10)
+    assert row[:] == [(1, 3), (5, 10)]
+    assert (1, 3) in row
+    assert (1, 10) not in row
+    assert row == [(1, 3), (5, 10)]
+
+
+def test_line_row_slice_assignment():
+    row = LineRow([(1, 3), (5, 10), (12, 14)])
+    row[0:2] = [(1, 10)]
+    assert row == [(1, 10), (12, 14)]
+    row[-1] = (12, 20)
+    assert row == LineRow([(1, 10), (12, 20)])
+
+
+def test_linestore_get_lines_is_a_view():
+    """get_lines() reflects later changes of the LineStore"""
+    ls = LineStore("horizontal")
+    ls.add(((0, 1), (4, 1)))
+    lines = ls.get_lines(1)
+    ls.add(((3, 1), (7, 1)))
+    assert lines == [((0, 1), (7, 1))]
+    assert lines[0] == ((0, 1), (7, 1))
+
+
 def test_linestore_get_lines_horizontal():
     line1 = ((0, 1), (4, 1))
     line2 = ((5, 1), (7, 1))
@@ -161,6 +376,78 @@ def test_linestore_get_near_vertical():
     assert lines_near_6[3] == line4
 
 
+def test_linestore_get_lines_does_not_add_keys():
+    ls = LineStore("horizontal")
+    ls.add(((0, 1), (4, 1)))
+    assert not ls.get_lines(3)
+    assert not ls.get_near(10)
+    assert list(ls.lines) == [1]
+
+
+def test_linestore_get_near_is_cached():
+    ls = LineStore("vertical")
+    ls.add(((5, 1), (5, 4)))
+    assert ls.get_near(6) is ls.get_near(6)
+
+
+def test_linestore_get_near_after_add():
+    """Adding a line to a key near the requested one updates the result of get_near"""
+    ls = LineStore("vertical")
+    ls.add(((5, 1), (5, 4)))
+    assert ls.get_near(6) == (((5, 1), (5, 4)),)
+    ls.add(((8, 0), (8, 5)))
+    ls.add(((5, 3), (5, 10)))
+    assert ls.get_near(6) == (((5, 1), (5, 10)), ((8, 0), (8, 5)))
+    ls.remove(((8, 0), (8, 5)))
+    assert ls.get_near(6) == (((5, 1), (5, 10)),)
+
+
+def test_linestore_get_lines_after_simplify():
+    ls = LineStore("horizontal", auto_simplify=False)
+    ls.add(((0, 1), (4, 1)))
+    ls.add(((3, 1), (7, 1)))
+    assert len(ls.get_lines(1)) == 2
+    ls.simplify()
+    assert ls.get_lines(1) == [((0, 1), (7, 1))]
+
+
+def test_linestore_segments():
+    ls = LineStore("vertical")
+    ls.add(((7, 0), (7, 5)))
+    ls.add(((3, 4), (3, 1)))
+    ls.add(((3, 10), (3, 12)))
+    assert list(ls.segments()) == [(3, 1, 4), (3, 10, 12), (7, 0, 5)]
+
+
+def test_linestore_extend():
+    """Adding many lines at once gives the same result as adding them one by one"""
+    lines = [((5, 1), (8, 1)), ((2, 1), (0, 1)), ((2, 1), (6, 1)), ((3, 4), (4, 4))]
+    ls1 = LineStore("horizontal")
+    ls1.extend(lines)
+    ls2 = LineStore("horizontal")
+    for line in lines:
+        ls2.add(line)
+    assert ls1.lines == ls2.lines
+    assert ls1.keys_between(0, 10) == [1, 4]
+
+
+def test_linestore_extend_segments_into_existing_rows():
+    ls = LineStore("vertical")
+    ls.add(((3, 0), (3, 2)))
+    ls.extend_segments([(3, 6, 4), (3, 2, 3), (1, 0, 5)])
+    assert ls.lines[3] == [(0, 3), (4, 6)]
+    assert ls.keys_between(0, 5) == [1, 3]
+
+
+def test_decompose_rects():
+    horizontals, verticals = decompose_rects(
+        pygame.Rect(0, 0, 10, 5), (10, 0, 5, 5), pygame.Rect(20, 0, 5, 5)
+    )
+    assert horizontals.lines[0] == [(0, 15), (20, 25)]
+    assert horizontals.lines[5] == [(0, 15), (20, 25)]
+    assert verticals.keys_between(0, 25) == [0, 10, 15, 20, 25]
+
+
 def test_polyline2linesegments():
     pl = [(0, 0), (0, 2), (3, 2), (3, 5)]
     expected = [((0, 0), (0, 2)), ((0, 2), (3, 2)), ((3, 2), (3, 5))]
@@ -426,3 +713,72 @@ def test_line_intersect1_vertical_no_intersection():
     ls.add(line4)
     the_line = ((6, 14), (9, 14))  # horizontal line!
     assert not line_intersect(the_line, ls)
+
+
+def test_stix_store_matches_decompose_polyline():
+    """All line segments but the last are kept in the LineStores of a StixStore"""
+    points = [(0, 0), (0, 10), (10, 10), (10, 20), (30, 20)]
+    stix = StixStore(*points)
+    horizontals, verticals = decompose_polyline(points[:-1])
+    assert stix.horizontals.lines == horizontals.lines
+    assert stix.verticals.lines == verticals.lines
+    assert list(stix) == points
+
+
+def test_stix_store_extend_last():
+    stix = StixStore((0, 0), (0, 10), (10, 10))
+    stix.extend_last((15, 10))
+    assert stix[-1] == (15, 10)
+    assert len(stix) == 3
+    assert not stix.horizontals.get_lines(10)
+
+
+def test_stix_store_line_intersect():
+    stix = StixStore((0, 0), (0, 10), (10, 10), (10, 5))
+    # crossing the first segment
+    assert stix.line_intersect(((-5, 3), (5, 3))) == (0, 3)
+    # crossing the last segment
+    assert stix.line_intersect(((5, 7), (15, 7))) == (10, 7)
+    # starting at the end of the stix
+    assert not stix.line_intersect(((10, 5), (20, 5)), ignore=(10, 5))
+    # reversing along the last segment
+    assert stix.line_intersect(((10, 5), (10, 8)), ignore=(10, 5))
+
+
+def test_stix_store_keeps_the_last_segment_up_to_date():
+    stix = StixStore((0, 0), (0, 10), (10, 10))
+    stores = stix._stores()
+    assert stix.line_intersect(((5, 5), (5, 15))) == (5, 10)
+    stix.extend_last((3, 10))
+    assert not stix.line_intersect(((5, 5), (5, 15)))
+    stix.append((3, 20))
+    assert stix.line_intersect(((0, 15), (5, 15))) == (3, 15)
+    assert stix._last_vertical.lines == {3: [(10, 20)]}
+    assert not stix._last_horizontal.lines
+    assert all(a is b for a, b in zip(stix._stores(), stores))  # no new LineStores
+
+
+def test_stix_store_clear():
+    stix = StixStore((0, 0), (0, 10), (10, 10))
+    stix.clear()
+    assert not stix
+    assert not stix.line_intersect(((-5, 3), (5, 3)))
+
+
+def test_linestore_add_integral_floats():
+    ls = LineStore("horizontal")
+    ls.add((pygame.Vector2(7, 0), pygame.Vector2(2, 0)))
+    assert list(ls.lines) == [0]
+    assert isinstance(list(ls.lines)[0], int)
+    assert ls.lines[0] == [(2, 7)]
+
+
+def test_linestore_add_rejects_fractions():
+    ls = LineStore("horizontal")
+    with pytest.raises(ValueError):
+        ls.add(((2.5, 0), (7.9, 0)))
+    with pytest.raises(ValueError):
+        ls.add(((2, 0.5), (7, 0.5)))
+    with pytest.raises(ValueError):
+        LineStore("vertical").extend([((3, 0), (3, 4.5))])
+    assert not ls.lines
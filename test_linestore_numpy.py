@@ -0,0 +1,101 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from linestore import line_intersect, decompose_rects
+from linestore_numpy import ArrayLineStore
+
+
+@pytest.fixture
+def verticals():
+    ls = ArrayLineStore("vertical")
+    ls.add(((0, 1), (0, 4)))
+    ls.add(((5, 2), (5, 10)))
+    ls.add(((7, 20), (7, 25)))
+    ls.add(((3, 5), (3, 15)))
+    return ls
+
+
+def test_array_linestore_init_requires_dim():
+    with pytest.raises(ValueError):
+        ArrayLineStore("something else")
+
+
+def test_array_linestore_merges_segments():
+    ls = ArrayLineStore("horizontal")
+    ls.add(((5, 1), (8, 1)))
+    ls.add(((2, 1), (0, 1)))
+    ls.add(((2, 1), (6, 1)))
+    ls.add(((10, 1), (12, 1)))
+    ls.add(((3, 4), (4, 4)))
+    assert ls.get_lines(1) == [((0, 1), (8, 1)), ((10, 1), (12, 1))]
+    assert ls.get_lines(4) == [((3, 4), (4, 4))]
+    assert len(ls) == 3
+
+
+def test_array_linestore_get_near(verticals):
+    assert verticals.get_near(6) == [
+        ((5, 2), (5, 10)),
+        ((7, 20), (7, 25)),
+    ]
+
+
+def test_array_linestore_keys_between(verticals):
+    assert verticals.keys_between(1, 7) == [3, 5, 7]
+
+
+def test_array_linestore_works_with_line_intersect(verticals):
+    the_line = ((2, 8), (9, 8))  # horizontal line!
+    assert line_intersect(the_line, verticals) == (3, 8)
+    assert line_intersect(the_line, verticals, ignore=(3, 8)) == (5, 8)
+    assert line_intersect(((7, 19), (7, 21)), verticals) == ((7, 20), (7, 21))
+
+
+def test_line_intersect_many(verticals):
+    lines = [
+        ((2, 8), (9, 8)),  # crosses x=3 and x=5
+        ((6, 14), (9, 14)),  # no intersection
+        ((7, 19), (7, 21)),  # overlap
+        ((3, 2), (3, 5)),  # touches the end of a segment
+    ]
+    hit, points = verticals.line_intersect_many(lines)
+    assert hit.tolist() == [True, False, True, True]
+    assert points[hit].tolist() == [[3, 8], [7, 20], [3, 5]]
+
+
+def test_line_intersect_many_ignore(verticals):
+    lines = [((2, 8), (9, 8)), ((3, 2), (3, 5)), ((7, 20), (7, 22))]
+    ignore = [(3, 8), (3, 5), (7, 20)]
+    hit, points = verticals.line_intersect_many(lines, ignore=ignore)
+    assert hit.tolist() == [True, False, True]
+    assert points[0].tolist() == [5, 8]
+    assert points[2].tolist() == [7, 20]
+
+
+def test_line_intersect_many_empty_store():
+    ls = ArrayLineStore("horizontal")
+    hit, points = ls.line_intersect_many([((0, 0), (0, 5))])
+    assert not hit.any()
+
+
+def test_line_intersect_many_requires_orthogonal_lines(verticals):
+    with pytest.raises(ValueError):
+        verticals.line_intersect_many([((0, 0), (5, 5))])
+
+
+def test_array_linestore_extend():
+    ls = ArrayLineStore("horizontal")
+    ls.add(((0, 1), (2, 1)))
+    ls.extend(np.array([((5, 1), (8, 1)), ((2, 1), (4, 1))]))
+    assert ls.get_lines(1) == [((0, 1), (4, 1)), ((5, 1), (8, 1))]
+
+
+def test_decompose_rects_into_array_linestores():
+    horizontals, verticals = decompose_rects(
+        (0, 0, 10, 5),
+        horizontals=ArrayLineStore("horizontal"),
+        verticals=ArrayLineStore("vertical"),
+    )
+    assert isinstance(horizontals, ArrayLineStore)
+    assert horizontals.get_lines(5) == [((0, 5), (10, 5))]
+    assert verticals.keys_between(0, 10) == [0, 10]
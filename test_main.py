@@ -0,0 +1,221 @@
+import os
+from collections import deque
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+import pytest
+
+import main
+from halfedge import PlanarGraph
+from linestore import LineStore
+from paths import find_path
+
+
+@pytest.fixture
+def game(monkeypatch):
+    pygame.init()
+    monkeypatch.setattr(main, "QIX_COUNT", 3)
+    game = main.QixGame()
+    # Park the Qix: one on the left, two on the right, above each other
+    for qix, (x, y) in zip(game.qixes, [(100, 100), (600, 100), (600, 500)]):
+        qix.a_s = deque([pygame.Vector2(x, y)] * 10, maxlen=main.TRAIL_LENGTH)
+        qix.b_s = deque([pygame.Vector2(x + 3, y + 3)] * 10, maxlen=main.TRAIL_LENGTH)
+    yield game
+    pygame.quit()
+
+
+def close(game, points):
+    game.stix.clear()
+    for point in points:
+        game.stix.append(point)
+    game.close_area(None)
+
+
+def open_boundaries(game):
+    return sorted(list(region.boundary) for region in game.open_regions)
+
+
+def test_open_region_indexes_its_boundary(game):
+    (region,) = game.open_regions
+    assert region.boundary._slabs is not None
+    assert all(qix.boundary is region.boundary for qix in region.qixes)
+
+
+def test_split_keeps_both_sides_with_qix_open(game):
+    left, upper_right, lower_right = game.qixes
+    close(game, [(400, 5), (400, 593)])
+    assert game.score == 0
+    assert game.boundary_closed == []
+    assert open_boundaries(game) == [
+        [(5, 5), (400, 5), (400, 593), (5, 593)],
+        [(400, 593), (400, 5), (793, 5), (793, 593)],
+    ]
+    regions = {len(region.qixes): region for region in game.open_regions}
+    assert regions[1].qixes == [left]
+    assert regions[2].qixes == [upper_right, lower_right]
+    assert all(region.boundary._slabs is not None for region in game.open_regions)
+    assert upper_right.boundary is regions[2].boundary
+
+
+def test_region_of(game):
+    close(game, [(400, 5), (400, 593)])
+    right = next(region for region in game.open_regions if len(region.qixes) == 2)
+    # both ends lie on both regions, but the stix runs through the right one
+    assert game.region_of([(400, 100), (500, 100), (500, 200), (400, 200)]) is right
+    assert game.region_of([(200, 100), (300, 100)]) is None
+
+
+def test_closing_keeps_edges_shared_with_open_regions(game):
+    close(game, [(400, 5), (400, 593)])
+    close(game, [(793, 300), (400, 300)])
+    assert len(game.open_regions) == 3
+    # no Qix in the box: it is closed, its top edge still borders an open region
+    close(game, [(700, 300), (700, 400), (793, 400)])
+    assert [list(poly) for poly in game.boundary_closed] == [
+        [(793, 400), (700, 400), (700, 300), (793, 300)]
+    ]
+    assert len(game.open_regions) == 3
+    horizontals, verticals = LineStore("horizontal"), LineStore("vertical")
+    for region in game.open_regions:
+        for p0, p1 in region.boundary.line_segments():
+            (verticals if p0[0] == p1[0] else horizontals).add((p0, p1))
+    safe_horizontals = {k: r for k, r in game.safe_horizontals.lines.items() if r}
+    safe_verticals = {k: r for k, r in game.safe_verticals.lines.items() if r}
+    assert dict(horizontals.lines) == safe_horizontals
+    assert dict(verticals.lines) == safe_verticals
+    assert safe_horizontals[300] == [(400, 793)]
+
+
+def test_safe_graph_follows_the_safe_paths(game):
+    close(game, [(400, 5), (400, 593)])
+    close(game, [(793, 300), (400, 300)])
+    close(game, [(700, 300), (700, 400), (793, 400)])
+    lines = [((x0, y), (x1, y)) for y, x0, x1 in game.safe_horizontals.segments()]
+    lines += [((x, y0), (x, y1)) for x, y0, y1 in game.safe_verticals.segments()]
+    expected = PlanarGraph(lines)
+    assert {e.line for e in game.safe_graph.half_edges()} == {
+        e.line for e in expected.half_edges()
+    }
+    stix = [((793, 100), (600, 100)), ((600, 100), (600, 5))]
+    assert find_path(game.safe_graph, stix) == stix + [
+        ((600, 5), (793, 5)),
+        ((793, 5), (793, 100)),
+    ]
+
+
+def test_qix_bounces_off_its_region(game):
+    close(game, [(400, 5), (400, 593)])
+    qix = game.qixes[0]
+    velocity = pygame.Vector2(1, 0)
+    new = qix.keep_inside(pygame.Vector2(395, 50), pygame.Vector2(410, 50), velocity)
+    assert new == (390, 50)
+    assert velocity == (-1, 0)
+
+
+def hsv_to_rgb(hue):
+    color = pygame.Color(0)
+    color.hsva = (hue, 100, 100, 100)
+    return color.r, color.g, color.b
+
+
+@pytest.mark.parametrize(
+    "hue, expected_hue",
+    [
+        (0, 0),
+        (0.05, 0),
+        (59.95, 59.9),
+        (60, 60),
+        (123.4, 123.4),
+        (359.99, 359.9),
+        (360, 0),
+        (725.5, 5.5),
+        (-90, 270),
+        (-0.04, 359.9),
+    ],
+)
+def test_hue_color(hue, expected_hue):
+    color = main.hue_color(hue)
+    assert all(isinstance(c, int) for c in color)
+    # acrylic and pygame round a little differently
+    assert all(abs(c - e) <= 1 for c, e in zip(color, hsv_to_rgb(expected_hue))), (
+        color,
+        hsv_to_rgb(expected_hue),
+    )
+
+
+@pytest.mark.parametrize(
+    "hue, step",
+    [
+        (0, 0),
+        (0.09, 0),
+        (0.1, 1),
+        (359.95, 3599),
+        (360, 0),
+        (-0.04, 3599),
+        (-30.04, 3299),
+    ],
+)
+def test_hue_color_rounds_down(hue, step):
+    assert main.hue_color(hue) is main.HUE_COLORS[step]
+
+
+def test_standing_still_does_not_close(game):
+    (region,) = game.open_regions
+    before = list(region.boundary)
+    player = game.player.sprites()[0]
+    player.update(50, "down")  # blocked by the border: the stix is a single point
+    for event in pygame.event.get(main.CLOSE_AREA):
+        game.close_area(event)
+    close(game, [(399, 593), (399, 593)])
+    assert game.open_regions == [region]
+    assert list(region.boundary) == before
+    assert region.boundary.area() > 0
+    assert len(game.stix) == 0
+
+
+def test_stix_along_the_boundary_does_not_close(game):
+    (region,) = game.open_regions
+    before = list(region.boundary)
+    close(game, [(5, 49), (5, 45)])
+    assert game.open_regions == [region]
+    assert list(region.boundary) == before
+    assert game.score == 0
+    assert game.region_of([(5, 49), (5, 45)]) is None
+    assert game.region_of([(5, 49), (50, 49), (50, 45), (5, 45)]) is region
+
+
+def test_stix_without_area_does_not_close(game):
+    (region,) = game.open_regions
+    before = list(region.boundary)
+    close(game, [(5, 49), (50, 49), (5, 49)])  # in and back out again
+    assert game.open_regions == [region]
+    assert list(region.boundary) == before
+    assert game.boundary_closed == []
+
+
+def test_stix_leaving_the_open_area_does_not_close(game):
+    game.qixes[:] = game.qixes[:1]
+    (region,) = game.open_regions
+    region.qixes[:] = game.qixes
+    qix = game.qixes[0]
+    qix.a_s = deque([pygame.Vector2(600, 300)] * 10, maxlen=main.TRAIL_LENGTH)
+    qix.b_s = deque([pygame.Vector2(603, 303)] * 10, maxlen=main.TRAIL_LENGTH)
+    close(
+        game,
+        [(5, 585), (119, 585), (119, 561), (107, 561)]
+        + [(107, 437), (399, 437), (399, 593)],
+    )
+    closed = [list(polygon) for polygon in game.boundary_closed]
+    (region,) = game.open_regions
+    before = list(region.boundary)
+    score = game.score
+    # crosses the bottom edge of the open area into the closed area and back
+    close(
+        game, [(5, 573), (13, 573), (13, 593), (5, 593), (5, 581), (9, 581), (9, 585)]
+    )
+    assert [list(polygon) for polygon in game.boundary_closed] == closed
+    assert game.open_regions == [region]
+    assert list(region.boundary) == before
+    assert qix.boundary is region.boundary
+    assert game.score == score
@@ -1,6 +1,6 @@
 import pytest
 
-from polyline import Polyline
+from polyline import Polyline, _cells
 
 
 # Note: most of the basic behaviour is tested by test_closed_polyline
@@ -160,3 +160,53 @@ def test_polyline_intersect_may_return_none():
     path = Polyline(*points)
     line = ((3, 3), (5, 0))
     assert path.intersect(line) is None
+
+
+def test_polyline_insert_on_first_matching_segment():
+    """A point shared by two line segments is inserted after the first one"""
+    points = [(0, 0), (10, 0), (10, 10), (0, 10), (0, 5), (10, 5)]
+    path = Polyline(*points)
+    path.insert((5, 5))
+    assert path.points == [(0, 0), (10, 0), (10, 10), (0, 10), (0, 5), (5, 5), (10, 5)]
+    path.insert((10, 5))
+    assert path.index((10, 5)) == 2
+
+
+def test_polyline_intersect_misses_beyond_end_of_segment():
+    points = [(5, 20), (5, 30)]
+    path = Polyline(*points)
+    line = ((0, 5), (10, 5))
+    assert path.intersect(line) is None
+
+
+def test_polyline_intersect_returns_nearest_hit():
+    points = [(8, 0), (8, 10), (2, 10), (2, 0)]
+    path = Polyline(*points)
+    line = ((0, 5), (10, 5))
+    assert path.intersect(line) == (2, 5)
+    assert path.intersect(tuple(reversed(line))) == (8, 5)
+
+
+def test_polyline_intersections():
+    points = [(100, 0), (100, 100), (0, 100), (0, 50), (50, 50)]
+    path = Polyline(*points)
+    line = ((-10, 50), (110, 50))
+    found = path.intersections(line)
+    # hits at the same distance are ordered like the line segments
+    assert [intersection for intersection, _ in found] == [
+        (0, 50),  # the vertical segment ends on the line
+        ((0, 50), (50, 50)),
+        (100, 50),
+    ]
+    assert found[-1][1] == ((100, 0), (100, 100))
+    assert path.intersections(((200, 0), (200, 100))) == []
+
+
+def test_diagonal_lines_only_visit_the_grid_cells_they_cross():
+    cells = list(_cells(((0, 0), (127, 127))))
+    assert (0, 0) in cells and (3, 3) in cells
+    assert (0, 3) not in cells and (3, 0) not in cells
+    assert len(cells) == 7  # not all 16 cells of the bounding box
+    path = Polyline((0, 120), (120, 120), (120, 0))
+    found = path.intersections(((0, 0), (127, 127)))
+    assert [intersection for intersection, _ in found] == [(120, 120), (120, 120)]
@@ -0,0 +1,52 @@
+import pytest
+
+import orthogonal
+from paths import intersect_2d_segments, orientation, point_is_on_line
+
+
+@pytest.mark.parametrize(
+    "seg1, seg2, expected",
+    [
+        (((0, 5), (10, 5)), ((5, 0), (5, 10)), (5, 5)),  # crossing
+        (((0, 5), (10, 5)), ((5, 20), (5, 30)), None),  # too short
+        (((0, 5), (10, 5)), ((10, 0), (10, 5)), (10, 5)),  # touching ends
+        (((0, 5), (10, 5)), ((0, 6), (10, 6)), None),  # parallel
+        (((0, 5), (10, 5)), ((2, 5), (4, 5)), ((2, 5), (4, 5))),  # overlap
+        (((0, 5), (10, 5)), ((12, 5), (4, 5)), ((10, 5), (4, 5))),  # reversed overlap
+        (((0, 5), (10, 5)), ((10, 5), (15, 5)), (10, 5)),  # collinear, touching
+        (((0, 5), (10, 5)), ((11, 5), (15, 5)), None),  # collinear, apart
+        (((5, 0), (5, 10)), ((5, 10), (5, 3)), ((5, 10), (5, 3))),
+        (((7, 5), (7, 5)), ((0, 5), (10, 5)), (7, 5)),  # single point on segment
+        (((0, 5), (10, 5)), ((7, 7), (7, 7)), None),  # single point elsewhere
+        (((3, 3), (3, 3)), ((3, 3), (3, 3)), (3, 3)),
+    ],
+)
+def test_orthogonal_intersect(seg1, seg2, expected):
+    assert orthogonal.intersect(seg1, seg2) == expected
+    assert intersect_2d_segments(seg1, seg2) == expected
+
+
+def test_orthogonal_intersect_is_exact():
+    found = intersect_2d_segments(((0, 5), (10, 5)), ((5, 0), (5, 10)))
+    assert found == (5, 5)
+    assert all(isinstance(c, int) for c in found)
+
+
+@pytest.mark.parametrize(
+    "line_from, line_to, expected",
+    [
+        (((0, 10), (0, 0)), ((0, 0), (10, 0)), -1),  # up, then right
+        (((0, 10), (0, 0)), ((0, 0), (-10, 0)), 1),  # up, then left
+        (((0, 10), (0, 0)), ((0, 0), (0, -10)), 0),
+    ],
+)
+def test_orthogonal_turn(line_from, line_to, expected):
+    assert orthogonal.turn(line_from, line_to) == expected
+    assert orientation(line_from, line_to) == expected
+
+
+def test_point_is_on_line_rejects_diagonal_lines():
+    assert point_is_on_line((5, 5), ((0, 5), (10, 5)))
+    assert orthogonal.point_on_segment((5, 5), ((5, 5), (5, 5)))
+    with pytest.raises(ValueError):
+        point_is_on_line((5, 5), ((0, 0), (10, 10)))
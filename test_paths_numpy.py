@@ -0,0 +1,64 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from paths import intersect_2d_segments
+from paths_numpy import (
+    NONE,
+    POINT,
+    SEGMENT,
+    as_intersection,
+    intersect_2d_segments_many,
+)
+
+SEGMENTS = [
+    ((0, 5), (10, 5)),  # horizontal
+    ((5, 0), (5, 10)),  # vertical
+    ((5, 20), (5, 30)),  # vertical, beyond the end of the horizontal
+    ((2, 5), (4, 5)),  # overlaps the horizontal
+    ((10, 5), (15, 5)),  # touches the end of the horizontal
+    ((1, 3), (3, 2)),  # diagonal
+    ((7, 5), (7, 5)),  # a single point on the horizontal
+    ((7, 7), (7, 7)),  # a single point elsewhere
+    ((2, 0), (2, 4)),
+]
+
+
+def test_intersect_2d_segments_many_kinds():
+    kind, points = intersect_2d_segments_many(SEGMENTS[:1], SEGMENTS)
+    assert kind.shape == (1, len(SEGMENTS))
+    assert points.shape == (1, len(SEGMENTS), 2, 2)
+    assert kind[0].tolist() == [
+        SEGMENT,
+        POINT,
+        NONE,
+        SEGMENT,
+        POINT,
+        NONE,
+        POINT,
+        NONE,
+        NONE,
+    ]
+    assert points[0, 1].tolist() == [[5, 5], [5, 5]]
+    assert points[0, 3].tolist() == [[2, 5], [4, 5]]
+
+
+def test_intersect_2d_segments_many_matches_intersect_2d_segments():
+    kind, points = intersect_2d_segments_many(SEGMENTS, SEGMENTS)
+    for i, seg1 in enumerate(SEGMENTS):
+        for j, seg2 in enumerate(SEGMENTS):
+            expected = intersect_2d_segments(seg1, seg2)
+            found = as_intersection(kind[i, j], points[i, j])
+            if expected is None:
+                assert found is None
+            elif isinstance(expected[0], (int, float)):
+                assert found == pytest.approx(tuple(expected))
+            else:
+                assert found[0] == pytest.approx(tuple(expected[0]))
+                assert found[1] == pytest.approx(tuple(expected[1]))
+
+
+def test_intersect_2d_segments_many_empty():
+    kind, points = intersect_2d_segments_many(SEGMENTS, [])
+    assert kind.shape == (len(SEGMENTS), 0)
+    assert points.shape == (len(SEGMENTS), 0, 2, 2)
@@ -0,0 +1,95 @@
+import pygame
+import pytest
+
+from piecetable import Buffer, PieceTable
+
+
+def test_piecetable_is_a_sequence():
+    points = [(0, 0), (10, 0), (10, 10), (0, 10)]
+    table = PieceTable(points)
+    assert len(table) == 4
+    assert table == points
+    assert points == table
+    assert table[1] == (10, 0)
+    assert table[-1] == (0, 10)
+    assert table[1:3] == [(10, 0), (10, 10)]
+    assert list(reversed(table)) == list(reversed(points))
+    with pytest.raises(IndexError):
+        table[4]
+
+
+def test_piecetable_index():
+    table = PieceTable.join([[(0, 0), (5, 0)], [(5, 5), (0, 0)]])
+    assert table.index((0, 0)) == 0
+    assert table.index(pygame.Vector2(5, 5)) == 2
+    assert (5, 0) in table
+    assert (1, 1) not in table
+    with pytest.raises(ValueError):
+        table.index((1, 1))
+
+
+def test_piecetable_index_respects_piece_bounds():
+    buffer = Buffer([(0, 0), (1, 0), (2, 0), (3, 0)])
+    table = PieceTable(buffer).cut(2, None)
+    assert table == [(2, 0), (3, 0)]
+    with pytest.raises(ValueError):
+        table.index((0, 0))
+    assert table.index((3, 0)) == 1
+
+
+def test_piecetable_cut_and_join_share_buffers():
+    table = PieceTable([(i, 0) for i in range(10)])
+    joined = PieceTable.join([table.cut(0, 3), [(3, 5)], table.cut(4, 10)])
+    assert joined == [(0, 0), (1, 0), (2, 0), (3, 5)] + [(i, 0) for i in range(4, 10)]
+    (buffer, *_), _, (other, *_) = [piece[1:] for piece in joined.pieces()]
+    assert buffer is other is next(table.pieces())[1]
+
+
+def test_piecetable_join_merges_adjacent_pieces():
+    table = PieceTable([(i, 0) for i in range(10)])
+    joined = PieceTable.join([table.cut(0, 3), table.cut(3, 7)])
+    assert len(list(joined.pieces())) == 1
+
+
+def test_piecetable_insert():
+    table = PieceTable([(0, 0), (10, 0)])
+    table.insert(1, (5, 0))
+    table.insert(0, (-5, 0))
+    table.append((15, 0))
+    assert table == [(-5, 0), (0, 0), (5, 0), (10, 0), (15, 0)]
+
+
+def test_piecetable_flattens_many_pieces():
+    table = PieceTable()
+    for i in range(100):
+        table.append((i, 0))
+    assert table == [(i, 0) for i in range(100)]
+    assert len(list(table.pieces())) < 100
+    table.flatten()
+    assert len(list(table.pieces())) == 1
+    assert table == [(i, 0) for i in range(100)]
+
+
+def test_piecetable_content_hash():
+    points = [(i, i % 3) for i in range(20)]
+    table = PieceTable(points)
+    pieced = PieceTable.join([table.cut(0, 7), points[7:12], table.cut(12, None)])
+    assert len(list(pieced.pieces())) == 3
+    assert (
+        pieced.content_hash()
+        == table.content_hash()
+        == PieceTable(points).content_hash()
+    )
+    assert pieced == table
+    other = PieceTable(points[:-1] + [(0, 0)])
+    assert other.content_hash() != table.content_hash()
+    assert other != table
+
+
+def test_slice_copies_only_the_slice(monkeypatch):
+    table = PieceTable.join([PieceTable([(0, 0), (1, 0)]), [(2, 0), (3, 0), (4, 0)]])
+    monkeypatch.setattr(PieceTable, "__iter__", None)  # no full copy
+    assert table[1:4] == [(1, 0), (2, 0), (3, 0)]
+    assert table[:1] == [(0, 0)]
+    assert table[-2:] == [(3, 0), (4, 0)]
+    assert table[3:1] == []
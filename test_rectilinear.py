@@ -0,0 +1,125 @@
+import pygame
+import pytest
+
+from polyline import ClosedPolyline, rect2poly
+from rectilinear import union, union_into
+
+
+def rect(x, y, w, h):
+    return rect2poly(pygame.Rect(x, y, w, h))
+
+
+def normalized(polygon):
+    """The points of a polygon, starting with the smallest one"""
+    points = list(polygon)
+    first = points.index(min(points))
+    return points[first:] + points[:first]
+
+
+def test_union_of_adjacent_rects():
+    merged = union([rect(0, 0, 10, 10), rect(10, 0, 5, 10)])
+    assert len(merged) == 1
+    assert normalized(merged[0]) == [(0, 0), (15, 0), (15, 10), (0, 10)]
+    assert merged[0].area() == 150
+
+
+def test_union_of_partly_adjacent_rects():
+    merged = union([rect(0, 0, 10, 10), rect(10, 5, 5, 10)])
+    assert len(merged) == 1
+    assert normalized(merged[0]) == [
+        (0, 0),
+        (10, 0),
+        (10, 5),
+        (15, 5),
+        (15, 15),
+        (10, 15),
+        (10, 10),
+        (0, 10),
+    ]
+
+
+def test_union_keeps_separate_polygons():
+    merged = union([rect(0, 0, 10, 10), rect(20, 0, 5, 5)])
+    assert sorted(polygon.area() for polygon in merged) == [25, 100]
+
+
+def test_union_of_rects_touching_at_a_corner():
+    merged = union([rect(0, 0, 10, 10), rect(10, 10, 10, 10)])
+    assert sorted(normalized(polygon) for polygon in merged) == [
+        [(0, 0), (10, 0), (10, 10), (0, 10)],
+        [(10, 10), (20, 10), (20, 20), (10, 20)],
+    ]
+
+
+def test_union_with_hole():
+    ring = [
+        rect(0, 0, 30, 10),
+        rect(0, 20, 30, 10),
+        rect(0, 10, 10, 10),
+        rect(20, 10, 10, 10),
+    ]
+    merged = union(ring)
+    assert sorted(polygon.area() for polygon in merged) == [-100, 900]
+    hole = next(polygon for polygon in merged if polygon.area() < 0)
+    assert sorted(hole) == [(10, 10), (10, 20), (20, 10), (20, 20)]
+
+
+def test_union_accepts_uncompacted_polygons():
+    polygon = ClosedPolyline((0, 0), (5, 0), (10, 0), (10, 10), (0, 10))
+    merged = union([polygon, rect(10, 0, 10, 10)])
+    assert normalized(merged[0]) == [(0, 0), (20, 0), (20, 10), (0, 10)]
+
+
+def test_union_rejects_diagonal_edges():
+    with pytest.raises(ValueError):
+        union([ClosedPolyline((0, 0), (10, 0), (0, 10))])
+
+
+def test_union_into():
+    polygons = []
+    for rect_ in [rect(0, 0, 10, 10), rect(50, 0, 10, 10), rect(10, 0, 10, 10)]:
+        polygons = union_into(polygons, rect_)
+    assert sorted(polygon.area() for polygon in polygons) == [100, 200]
+
+
+@pytest.mark.parametrize(
+    "polygons",
+    [
+        [rect(0, 0, 10, 10), rect(5, 5, 10, 10)],  # crossing
+        [rect(0, 0, 10, 10), rect(2, 2, 3, 3)],  # one inside the other
+        [rect(0, 0, 10, 10), rect(0, 0, 10, 5)],  # sharing edges in one direction
+        [rect(0, 0, 10, 10), rect(0, 0, 10, 10)],
+    ],
+)
+def test_union_of_overlapping_polygons_raises(polygons):
+    with pytest.raises(ValueError):
+        union(polygons)
+
+
+def test_union_of_self_overlapping_polygon_raises():
+    # runs back along its own bottom edge and out of itself
+    polygon = ClosedPolyline(
+        [(5, 585), (119, 585), (119, 561), (107, 561)]
+        + [(107, 437), (399, 437), (399, 593), (5, 593)]
+    )
+    folded = ClosedPolyline(
+        [
+            (5, 573),
+            (13, 573),
+            (13, 593),
+            (5, 593),
+            (5, 581),
+            (9, 581),
+            (9, 585),
+            (5, 585),
+        ]
+    )
+    with pytest.raises(ValueError):
+        union([folded])
+    with pytest.raises(ValueError):
+        union_into([polygon], folded)
+
+
+def test_union_of_counter_clockwise_polygon_raises():
+    with pytest.raises(ValueError):
+        union([ClosedPolyline((0, 0), (0, 10), (10, 10), (10, 0))])
@@ -0,0 +1,71 @@
+import pygame
+
+from linestore import LineStore, decompose_polyline, decompose_rects
+from sweepline import intersections, self_intersections
+
+
+def test_intersections_stix_vs_boundary():
+    boundary = decompose_rects(pygame.Rect(0, 0, 40, 50))
+    stix = decompose_polyline([(0, 20), (20, 20), (20, 30), (0, 30)])
+    found = intersections(stix, boundary)
+    assert [point for point, _, _ in found] == [(0, 20), (0, 30)]
+    assert found[0] == ((0, 20), ((0, 20), (20, 20)), ((0, 0), (0, 50)))
+
+
+def test_intersections_reports_all_crossings():
+    horizontals = LineStore("horizontal")
+    verticals = LineStore("vertical")
+    for y in (1, 3, 5):
+        horizontals.add(((0, y), (10, y)))
+    for x in (2, 4):
+        verticals.add(((x, 0), (x, 4)))
+    found = intersections(
+        (horizontals, LineStore("vertical")), (LineStore("horizontal"), verticals)
+    )
+    assert [point for point, _, _ in found] == [(2, 1), (2, 3), (4, 1), (4, 3)]
+
+
+def test_intersections_overlaps():
+    first = LineStore("horizontal"), LineStore("vertical")
+    second = LineStore("horizontal"), LineStore("vertical")
+    first[0].add(((0, 1), (5, 1)))
+    second[0].add(((3, 1), (8, 1)))
+    first[1].add(((7, 0), (7, 4)))
+    second[1].add(((7, 4), (7, 9)))
+    found = intersections(first, second)
+    assert found == [
+        (((3, 1), (5, 1)), ((0, 1), (5, 1)), ((3, 1), (8, 1))),
+        ((7, 1), ((7, 0), (7, 4)), ((3, 1), (8, 1))),
+        ((7, 4), ((7, 0), (7, 4)), ((7, 4), (7, 9))),
+    ]
+
+
+def test_intersections_single_set_includes_corners():
+    stix = decompose_polyline([(0, 20), (20, 20), (20, 30)])
+    assert [point for point, _, _ in intersections(stix)] == [(20, 20)]
+
+
+def test_self_intersections():
+    points = [(0, 0), (10, 0), (10, 10), (5, 10), (5, -5)]
+    assert self_intersections(points) == [(5, 0)]
+
+
+def test_self_intersections_none():
+    points = [(0, 0), (10, 0), (10, 10), (5, 10), (5, 5)]
+    assert self_intersections(points) == []
+
+
+def test_self_intersections_doubling_back():
+    points = [(0, 0), (10, 0), (10, 5), (5, 5), (5, 0), (3, 0)]
+    assert self_intersections(points) == [((3, 0), (5, 0))]
+
+
+def test_self_intersections_repeated_vertex():
+    points = [(0, 0), (4, 0), (4, 4), (8, 4), (8, 0), (4, 0)]
+    assert self_intersections(points) == [(4, 0)]
+
+
+def test_self_intersections_reversing_neighbour():
+    points = [(0, 0), (10, 0), (4, 0)]
+    assert self_intersections(points) == [((4, 0), (10, 0))]
+    assert self_intersections([(0, 0), (5, 0), (10, 0)]) == []